@@ -1,9 +1,5 @@
 import streamlit as st
 from pathlib import Path
-from lib.config_editor_page import config_editor_page
-from lib.dataset_editor_page import dataset_builder_page
-from lib.automatic_evaluation_page import automatic_evaluation_page
-from lib.manual_evaluation_page import manual_evaluation_page
 
 
 # Must be the first Streamlit command
@@ -82,13 +78,18 @@ def main():
     st.sidebar.markdown('</div>', unsafe_allow_html=True)
 
     # Display current page based on session state
+    # (pages are imported on first visit, so that the app does not load every dependency at startup)
     if st.session_state.current_page == "Configuration Editor":
+        from lib.config_editor_page import config_editor_page
         config_editor_page()
     elif st.session_state.current_page == "Datasets Page":
+        from lib.dataset_editor_page import dataset_builder_page
         dataset_builder_page()
     elif st.session_state.current_page == "Automatic Evaluation":
+        from lib.automatic_evaluation_page import automatic_evaluation_page
         automatic_evaluation_page()
     else:
+        from lib.manual_evaluation_page import manual_evaluation_page
         manual_evaluation_page()
 
     # Footer
@@ -0,0 +1,76 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+
+# Offline configuration of the mock backend, scaled up by the benchmark
+MOCK_CONFIG_DIR = Path("config/mock")
+TASK_NAME = "summarization"
+
+
+def build_benchmark_config(work_dir: Path, n_cases: int, latency: float) -> Path:
+    """
+    Write a configuration with a single task of `n_cases` mock cases, and mock models of the given latency.
+
+    Returns:
+        The configuration directory
+    """
+    from lib.utils import load_dataset, load_yaml, save_dataset
+
+    config_dir = work_dir / "config"
+    shutil.copytree(MOCK_CONFIG_DIR, config_dir)
+
+    tasks = load_yaml(config_dir / "tasks.yaml")
+    task_config = dict(tasks["tasks"][TASK_NAME])
+    dataset = load_dataset(task_config["dataset_path"])
+    cases = dataset["test_cases"]
+    dataset["test_cases"] = [{**cases[i % len(cases)], "case_id": i + 1,
+                              "instruction": f"{cases[i % len(cases)]['instruction']} ({i})"}
+                             for i in range(n_cases)]
+    dataset_path = work_dir / "dataset.yaml"
+    save_dataset(path_to_fname=dataset_path, dataset=dataset)
+
+    task_config.update({"dataset_path": str(dataset_path), "executor_options": {"max_workers": 4}})
+    tasks["tasks"] = {TASK_NAME: task_config}
+    save_dataset(path_to_fname=config_dir / "tasks.yaml", dataset=tasks)
+
+    for fname in ("candidate_model.yaml", "evaluator.yaml"):
+        config = load_yaml(config_dir / fname)
+        config["parameters"]["latency_mean"] = latency
+        save_dataset(path_to_fname=config_dir / fname, dataset=config)
+    return config_dir
+
+
+def run_benchmark(jobs_list: List[int], n_cases: int, latency: float) -> List[Dict[str, float]]:
+    """Run the benchmark task with each number of worker processes, and measure the wall time."""
+    from main import run_evaluation
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = build_benchmark_config(Path(tmp), n_cases, latency)
+        for jobs in jobs_list:
+            start = time.perf_counter()
+            run_evaluation(config_dir, Path(tmp) / f"results_{jobs}", jobs=jobs)
+            wall_time = time.perf_counter() - start
+            rows.append({"jobs": jobs, "wall_time_s": wall_time, "cases_per_s": n_cases / wall_time})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the process pool mode (--jobs) on the mock backend")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4], help="Numbers of worker processes to compare")
+    parser.add_argument("--cases", type=int, default=2000, help="Number of test cases of the benchmark task")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Mean latency of the mock calls in seconds (0 measures the Python-side work only)")
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.jobs, args.cases, args.latency)
+    print(f"\n{args.cases} cases, mock latency {args.latency}s, {os.cpu_count()} CPUs")
+    print(f"{'jobs':>5} {'wall time (s)':>14} {'cases/s':>9} {'speedup':>8}")
+    for row in rows:
+        speedup = rows[0]["wall_time_s"] / row["wall_time_s"]
+        print(f"{row['jobs']:>5} {row['wall_time_s']:>14.2f} {row['cases_per_s']:>9.1f} {speedup:>8.2f}x")
@@ -0,0 +1,92 @@
+import re
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+
+# Modules that must not be imported on CLI cold start (`main.py --help`):
+# they are loaded by the functions that need them
+HEAVY_MODULES = (
+    "langchain_core",
+    "langchain_openai",
+    "langchain_ollama",
+    "openai",
+    "pandas",
+    "numpy",
+    "ruamel",
+    "requests",
+    "tqdm",
+    "streamlit",
+)
+DEFAULT_BUDGET_MS = 150.0
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_imports(command: List[str]) -> List[Tuple[str, int, int, int]]:
+    """
+    Run a Python command with `-X importtime` and parse the import times.
+
+    Args:
+        command: Arguments passed to the interpreter (e.g. ["main.py", "--help"])
+
+    Returns:
+        List of (module, self time in us, cumulative time in us, nesting level)
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", *command],
+                             capture_output=True, text=True)
+    imports = []
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return imports
+
+
+def check_import_time(
+    command: List[str],
+    budget_ms: float = DEFAULT_BUDGET_MS,
+    top: int = 10
+) -> bool:
+    """
+    Report the import time of a command and check it against the cold start budget.
+
+    The startup interpreter imports (`site` and `encodings`) are excluded from the total.
+
+    Args:
+        command: Arguments passed to the interpreter
+        budget_ms: Maximum total import time in milliseconds
+        top: Number of slowest top-level imports to report
+
+    Returns:
+        True if no heavy module is imported and the total import time is within budget
+    """
+    imports = measure_imports(command)
+    top_level = [(m, cumulative) for m, _, cumulative, level in imports
+                 if level == 0 and m not in ("site", "encodings")]
+    total_ms = sum(cumulative for _, cumulative in top_level) / 1000
+    loaded: Dict[str, int] = {m: cumulative for m, _, cumulative, _ in imports}
+
+    print(f"Import time of `python {' '.join(command)}`: {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    for module, cumulative in sorted(top_level, key=lambda x: -x[1])[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    heavy = sorted(m for m in loaded if m.split(".")[0] in HEAVY_MODULES and "." not in m)
+    if heavy:
+        print(f"FAIL: heavy modules imported on cold start: {', '.join(heavy)}")
+    if total_ms > budget_ms:
+        print(f"FAIL: import time {total_ms:.1f} ms exceeds the budget of {budget_ms:.0f} ms")
+
+    return not heavy and total_ms <= budget_ms
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the CLI cold start import time")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Maximum total import time")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to report")
+    parser.add_argument("command", nargs="*", default=["main.py", "--help"],
+                        help="Arguments of the interpreter (default: main.py --help)")
+    args = parser.parse_args()
+
+    sys.exit(0 if check_import_time(args.command, budget_ms=args.budget_ms, top=args.top) else 1)
@@ -1,19 +1,137 @@
+import re
 import logging
-from typing import List, Dict, Any, Optional
+import random
+import threading
+from contextlib import nullcontext
+from typing import List, Dict, Any, Optional, Tuple
 from tqdm import tqdm
 import json
 from pathlib import Path
 
+from lib.cache import make_key
+from lib.hedging import DEFAULT_MAX_EXTRA_LOAD, HedgePolicy
+
 logger = logging.getLogger(__name__)
 
 
+PROMPT_LAYOUTS = ("inline", "cached")
+PLACEHOLDER_PATTERN = re.compile(r"\[\[[a-z0-9_]+\]\]")
+
+
+def split_prompt_template(prompt_template: str) -> Tuple[str, str]:
+    """
+    Split a judge prompt template into its static rubric and its per-case part.
+
+    Lines holding a [[placeholder]] form the per-case part (in template order), all the other
+    lines form the rubric, which is identical for every case. The line introducing the first
+    placeholder line (e.g. "You will be provided with the following context:") moves with the
+    per-case part.
+
+    Returns:
+        Tuple of the rubric and the template of the per-case context
+    """
+    rubric, case_lines = [], []
+    header = "Context:"
+    for line in prompt_template.splitlines():
+        if not PLACEHOLDER_PATTERN.search(line):
+            rubric.append(line)
+            continue
+        if not case_lines:
+            previous = [i for i, rubric_line in enumerate(rubric) if rubric_line.strip()]
+            if previous and rubric[previous[-1]].rstrip().endswith(":"):
+                header = rubric.pop(previous[-1]).strip()
+        case_lines.append(line)
+    rubric_text = re.sub(r"\n{3,}", "\n\n", "\n".join(rubric)).strip() + "\n"
+    return rubric_text, header + "\n\n" + "\n".join(line.strip() for line in case_lines)
+
+
+def build_judge_prompt(prompt_template: str, fields: Dict[str, str], layout: str = "inline") -> Any:
+    """
+    Build the judge prompt of a case.
+
+    Args:
+        prompt_template: Judge prompt template with [[placeholder]] fields
+        fields: Values of the placeholders (names without brackets)
+        layout: "inline" sends the filled template as a single message. "cached" sends the static
+            rubric as a leading system message, identical for every case so that the provider can
+            cache it, followed by the per-case fields in a user message
+
+    Returns:
+        The prompt string (inline) or the list of (role, content) messages (cached)
+    """
+    def fill(template: str) -> str:
+        for name, value in fields.items():
+            template = template.replace(f"[[{name}]]", value)
+        return template
+
+    if layout == "inline":
+        return fill(prompt_template)
+    if layout == "cached":
+        rubric, case_template = split_prompt_template(prompt_template)
+        return [("system", rubric), ("human", fill(case_template))]
+    raise ValueError(f"Unsupported prompt layout: {layout}. Must be one of {PROMPT_LAYOUTS}")
+
+
+def judge_options(evaluator_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Options of the Evaluator and PairwiseEvaluator set in evaluator.yaml: prompt layout and hedging of the judge calls."""
+    return {
+        "prompt_layout": evaluator_config.get("prompt_layout", "inline"),
+        "hedge_percentile": evaluator_config.get("hedge_percentile"),
+        "hedge_max_extra_load": evaluator_config.get("hedge_max_extra_load", DEFAULT_MAX_EXTRA_LOAD)
+    }
+
+
+def invoke_judge(
+    model: Any,
+    prompt: Any,
+    hedge: Optional[HedgePolicy] = None,
+    call_limit: Optional[threading.Semaphore] = None
+) -> Tuple[Any, Dict[str, Any]]:
+    """Call the judge model, with a hedged duplicate call if it is slow and `hedge` is set, each holding `call_limit` if set."""
+    # LangChain is only imported when a model is called
+    from lib.metrics import invoke_with_usage
+
+    if hedge is not None:
+        return hedge.invoke(model, prompt, call_limit=call_limit)
+    with call_limit or nullcontext():
+        return invoke_with_usage(model, prompt)
+
+
 class Evaluator:
     """Handles evaluation of model outputs."""
     
-    def __init__(self, model: Any, prompt_template: str):
-        """Initialize with evaluation model."""
+    def __init__(
+        self,
+        model: Any,
+        prompt_template: str,
+        cache: Optional[Any] = None,
+        model_key: str = "",
+        prompt_layout: str = "inline",
+        hedge_percentile: Optional[float] = None,
+        hedge_max_extra_load: float = DEFAULT_MAX_EXTRA_LOAD,
+        call_limit: Optional[threading.Semaphore] = None
+    ):
+        """
+        Initialize with evaluation model.
+
+        Args:
+            model: Evaluator (judge) model
+            prompt_template: Template of the evaluation prompt
+            cache: Optional ResponseCache, to reuse the verdicts of identical evaluation prompts
+            model_key: Signature of the evaluator model, used as cache key
+            prompt_layout: "cached" (static rubric as leading system message) or "inline" (see `build_judge_prompt`)
+            hedge_percentile: If set, a judge call still running after this percentile of the observed
+                latencies is duplicated and the first response is used (see lib.hedging)
+            hedge_max_extra_load: Maximum ratio of duplicate judge calls to judge calls
+            call_limit: Optional semaphore held during each judge call (see tasks._base.TaskEngine)
+        """
         self.model = model
         self.prompt_template = prompt_template
+        self.cache = cache
+        self.model_key = model_key
+        self.prompt_layout = prompt_layout
+        self.hedge = HedgePolicy(hedge_percentile, hedge_max_extra_load) if hedge_percentile is not None else None
+        self.call_limit = call_limit
     
     def evaluate_response(
         self,
@@ -34,25 +152,36 @@ class Evaluator:
             challenges: Additional context for evaluation (potential challenges for the candidate model)
             
         Returns:
-            Evaluation results including score and feedback
+            Evaluation results including score, feedback and usage of the judge call
         """
         # Create evaluation prompt
-        prompt = self.prompt_template.replace("[[system_prompt_candidate_model]]", system_prompt)
-        prompt = prompt.replace("[[instruction_candidate_model]]", instruction)
-        prompt = prompt.replace("[[response_candidate_model]]", response)
-        prompt = prompt.replace("[[expected_response_candidate_model]]", expected_response)
-        prompt = prompt.replace("[[challenges]]", challenges)
+        prompt = build_judge_prompt(self.prompt_template, {
+            "system_prompt_candidate_model": system_prompt,
+            "instruction_candidate_model": instruction,
+            "response_candidate_model": response,
+            "expected_response_candidate_model": expected_response,
+            "challenges": challenges
+        }, layout=self.prompt_layout)
+
+        # Reuse the verdict of an identical evaluation prompt
+        cache_key = make_key(self.model_key, prompt) if self.cache is not None else None
+        if cache_key and (cached := self.cache.get("verdicts", cache_key)) is not None:
+            return {**cached, "usage": {"cached": True}}
+
         try:
             # Get evaluation from model
-            eval_response = self.model.invoke(prompt)
+            eval_response, usage = invoke_judge(self.model, prompt, self.hedge, self.call_limit)
             eval_text = eval_response.content if hasattr(eval_response, 'content') else eval_response
             
             # Extract score and feedback
             score = self._extract_score(eval_text)
+            if cache_key:
+                self.cache.set("verdicts", cache_key, {"score": score, "feedback": eval_text})
             
             return {
                 "score": score,
-                "feedback": eval_text
+                "feedback": eval_text,
+                "usage": usage
             }
             
         except Exception as e:
@@ -64,8 +193,6 @@ class Evaluator:
     
     def _extract_score(self, eval_text: str) -> float:
         """Extract numerical score from evaluation text."""
-        import re
-        
         # Look for score in format "Score: X" or similar
         patterns = [
             r'score:\s*(\d+(?:\.\d+)?)',
@@ -95,6 +222,8 @@ class Evaluator:
             List of records updated with evaluation scores and feedback from the evaluator
         """
         evaluated_results = []
+        if self.hedge is not None:
+            self.hedge.open()
         
         for record in tqdm(records, desc="Evaluating responses"):
             try:
@@ -111,6 +240,8 @@ class Evaluator:
                     "score": evaluation["score"],
                     "feedback": evaluation["feedback"]
                 })
+                if "usage" in evaluation:
+                    record["usage"] = {**(record.get("usage") or {}), "judge": evaluation["usage"]}
                 
             except Exception as e:
                 logger.error(f"Failed to evaluate result: {e}")
@@ -121,6 +252,10 @@ class Evaluator:
             
             evaluated_results.append(record)
         
+        if self.hedge is not None:
+            # Do not keep threads running the losers of hedged calls after the last task using the judge
+            self.hedge.close()
+
         # # Save results if path provided
         # if output_path:
         #     try:
@@ -133,6 +268,204 @@ class Evaluator:
         return evaluated_results
 
 
+class PairwiseEvaluator:
+    """
+    Handles comparative evaluation of the outputs of two candidate models (A and B).
+
+    The judge sees both responses in a single prompt. The position of the responses
+    in the prompt is randomized per case to control for position bias, and the verdict
+    is mapped back to the models.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        prompt_template: str,
+        seed: Optional[int] = None,
+        prompt_layout: str = "inline",
+        hedge_percentile: Optional[float] = None,
+        hedge_max_extra_load: float = DEFAULT_MAX_EXTRA_LOAD,
+        call_limit: Optional[threading.Semaphore] = None
+    ):
+        """Initialize with evaluation model (see `Evaluator` for the prompt layout, hedging and call_limit options)."""
+        self.model = model
+        self.prompt_template = prompt_template
+        self.seed = seed
+        self.prompt_layout = prompt_layout
+        self.hedge = HedgePolicy(hedge_percentile, hedge_max_extra_load) if hedge_percentile is not None else None
+        self.call_limit = call_limit
+
+    def evaluate_pair(
+        self,
+        system_prompt: str,
+        instruction: str,
+        response_a: str,
+        response_b: str,
+        expected_response: str,
+        challenges: str,
+        swap: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Compare the responses of two candidate models.
+
+        Args:
+            system_prompt: system_prompt given to the candidate models
+            instruction: instruction given to the candidate models
+            response_a: Response of candidate model A
+            response_b: Response of candidate model B
+            expected_response: Expected response
+            challenges: Additional context for evaluation (potential challenges for the candidate models)
+            swap: If True, response B is shown first to the judge
+
+        Returns:
+            Verdict ("A", "B" or "tie"), feedback and usage of the judge call
+        """
+        first, second = (response_b, response_a) if swap else (response_a, response_b)
+        prompt = build_judge_prompt(self.prompt_template, {
+            "system_prompt_candidate_model": system_prompt,
+            "instruction_candidate_model": instruction,
+            "response_1": first,
+            "response_2": second,
+            "expected_response_candidate_model": expected_response,
+            "challenges": challenges
+        }, layout=self.prompt_layout)
+        try:
+            eval_response, usage = invoke_judge(self.model, prompt, self.hedge, self.call_limit)
+            eval_text = eval_response.content if hasattr(eval_response, 'content') else eval_response
+
+            winner = self._extract_verdict(eval_text)
+            if winner == "1":
+                verdict = "B" if swap else "A"
+            elif winner == "2":
+                verdict = "A" if swap else "B"
+            else:
+                verdict = "tie"
+
+            return {
+                "verdict": verdict,
+                "feedback": eval_text,
+                "usage": usage
+            }
+
+        except Exception as e:
+            logger.error(f"Pairwise evaluation failed: {e}")
+            return {
+                "verdict": None,
+                "feedback": f"Evaluation error: {str(e)}"
+            }
+
+    def _extract_verdict(self, eval_text: str) -> str:
+        """Extract the winning position ("1", "2" or "tie") from evaluation text."""
+        # Look for verdict in format "Verdict: 1" or similar
+        patterns = [
+            r'verdict:\s*\**\s*(?:response\s*)?(1|2|tie)',
+            r'\*\*verdict\*\*:\s*(?:response\s*)?(1|2|tie)'
+        ]
+
+        for pattern in patterns:
+            if match := re.search(pattern, eval_text.lower()):
+                return match.group(1)
+
+        logger.warning(f"Could not extract verdict from: {eval_text}")
+        return "tie"
+
+    def evaluate_pairs(
+        self,
+        records_a: List[Dict[str, Any]],
+        records_b: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Compare the records of two candidate models on the same test cases.
+
+        Args:
+            records_a: Task records of candidate model A
+            records_b: Task records of candidate model B, in the same order
+
+        Returns:
+            List of test cases with both responses, the position shown to the judge,
+            the verdict and the judge feedback
+        """
+        rng = random.Random(self.seed)
+        evaluated_results = []
+        if self.hedge is not None:
+            self.hedge.open()
+
+        for record_a, record_b in tqdm(list(zip(records_a, records_b)), desc="Comparing responses"):
+            swap = rng.random() < 0.5
+            record = {k: v for k, v in record_a.items() if k not in ("model_response", "score", "feedback", "usage")}
+            evaluation = self.evaluate_pair(
+                system_prompt=record_a["system_prompt"],
+                instruction=record_a["instruction"],
+                response_a=record_a["model_response"],
+                response_b=record_b["model_response"],
+                expected_response=record_a["expected_response"],
+                challenges=record_a.get("challenges", ""),
+                swap=swap
+            )
+            record.update({
+                "response_a": record_a["model_response"],
+                "response_b": record_b["model_response"],
+                "judge_order": "BA" if swap else "AB",
+                "verdict": evaluation["verdict"],
+                "feedback": evaluation["feedback"],
+                "usage": {
+                    "candidate_a": (record_a.get("usage") or {}).get("candidate"),
+                    "candidate_b": (record_b.get("usage") or {}).get("candidate"),
+                    "judge": evaluation.get("usage")
+                }
+            })
+            evaluated_results.append(record)
+
+        if self.hedge is not None:
+            # Do not keep threads running the losers of hedged calls after the last task using the judge
+            self.hedge.close()
+        return evaluated_results
+
+
+def compare_prompt_layouts(
+    model: Any,
+    prompt_template: str,
+    records: List[Dict[str, Any]],
+    pricing: Optional[Dict[str, Any]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Judge the same records with the inline and the cached prompt layouts, and compare the judge usage and scores.
+
+    Providers only cache prompt prefixes above a minimum length (1024 tokens for OpenAI), and
+    the first calls of a layout warm the cache, so use at least a few dozen records.
+
+    Args:
+        model: Evaluator (judge) model
+        prompt_template: Template of the evaluation prompt
+        records: Task records with model responses
+        pricing: Prices of the evaluator model (see lib.metrics.call_cost)
+
+    Returns:
+        Judge usage summary and mean score per layout (latency percentiles, prompt and cached tokens,
+        cost), and a `scores` entry comparing the scores given to each record by both layouts
+    """
+    from copy import deepcopy
+    from lib.aggregation import get_scores
+    from lib.metrics import apply_pricing, summarize_usage
+
+    summaries, scores = {}, {}
+    for layout in PROMPT_LAYOUTS:
+        evaluated = Evaluator(model, prompt_template, prompt_layout=layout).evaluate_results(deepcopy(records))
+        apply_pricing(evaluated, "judge", pricing)
+        layout_scores = get_scores(evaluated)
+        summaries[layout] = {**summarize_usage(evaluated, roles=("judge",)).get("judge", {}),
+                             "mean_score": round(sum(layout_scores) / len(layout_scores), 4) if layout_scores else None}
+        scores[layout] = [record.get("score") for record in evaluated]
+
+    pairs = [(a, b) for a, b in zip(*(scores[layout] for layout in PROMPT_LAYOUTS)) if a is not None and b is not None]
+    summaries["scores"] = {
+        "n_records": len(pairs),
+        "agreement": round(sum(1 for a, b in pairs if a == b) / len(pairs), 4) if pairs else None,
+        "mean_abs_diff": round(sum(abs(a - b) for a, b in pairs) / len(pairs), 4) if pairs else None
+    }
+    return summaries
+
+
 if __name__ == "__main__":
     # Example usage
     from models import create_model
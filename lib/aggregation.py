@@ -0,0 +1,255 @@
+import logging
+import argparse
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from lib.utils import load_dataset, save_dataset
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_RESAMPLES = 10_000
+DEFAULT_CONFIDENCE = 0.95
+# Upper bound on the number of cells of one resampling matrix (resamples x cases),
+# so that large datasets are processed in chunks instead of allocating GBs at once
+MAX_MATRIX_CELLS = 4_000_000
+
+
+def _bootstrap_means(
+    values: np.ndarray,
+    n_resamples: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Compute the means of `n_resamples` bootstrap resamples of `values`.
+
+    Resamples are drawn as index matrices of shape (chunk, n) and reduced
+    with a single vectorized mean per chunk.
+    """
+    n = values.shape[0]
+    chunk = max(1, min(n_resamples, MAX_MATRIX_CELLS // max(n, 1)))
+    means = np.empty(n_resamples, dtype=float)
+    for start in range(0, n_resamples, chunk):
+        stop = min(start + chunk, n_resamples)
+        idx = rng.integers(0, n, size=(stop - start, n))
+        means[start:stop] = values[idx].mean(axis=1)
+    return means
+
+
+def bootstrap_ci(
+    scores: Sequence[float],
+    n_resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Percentile bootstrap confidence interval for the mean of `scores`.
+
+    Args:
+        scores: Per-case scores
+        n_resamples: Number of bootstrap resamples
+        confidence: Confidence level of the interval (e.g. 0.95)
+        seed: Seed of the random generator, for reproducible intervals
+
+    Returns:
+        Dict with the number of cases, the mean and the interval bounds
+    """
+    values = np.asarray(scores, dtype=float)
+    if values.size == 0:
+        return {"n": 0, "mean": None, "ci_low": None, "ci_high": None}
+
+    mean = float(values.mean())
+    if values.size == 1:
+        return {"n": 1, "mean": mean, "ci_low": mean, "ci_high": mean}
+
+    rng = np.random.default_rng(seed)
+    means = _bootstrap_means(values, n_resamples, rng)
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.quantile(means, [alpha, 1.0 - alpha])
+    return {
+        "n": int(values.size),
+        "mean": round(mean, 4),
+        "ci_low": round(float(low), 4),
+        "ci_high": round(float(high), 4)
+    }
+
+
+def get_scores(records: List[Dict[str, Any]]) -> List[float]:
+    """Return the scores of the evaluated records (records without score are skipped)."""
+    return [float(r["score"]) for r in records if r.get("score") is not None]
+
+
+def aggregate_results(
+    records: List[Dict[str, Any]],
+    n_resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Compute the mean score and its bootstrap confidence interval for a task,
+    overall and per difficulty_level.
+
+    Args:
+        records: List of evaluated task records
+        n_resamples: Number of bootstrap resamples
+        confidence: Confidence level of the intervals
+        seed: Seed of the random generator
+
+    Returns:
+        Summary dict, suitable for the `summary` entry of the results metadata
+    """
+    by_level: Dict[str, List[float]] = {}
+    for record in records:
+        if record.get("score") is None:
+            continue
+        level = str(record.get("difficulty_level", "unknown"))
+        by_level.setdefault(level, []).append(float(record["score"]))
+
+    return {
+        "n_resamples": n_resamples,
+        "confidence": confidence,
+        "seed": seed,
+        "overall": bootstrap_ci(get_scores(records), n_resamples, confidence, seed),
+        "by_difficulty_level": {
+            level: bootstrap_ci(scores, n_resamples, confidence, seed)
+            for level, scores in sorted(by_level.items())
+        }
+    }
+
+
+def paired_bootstrap_test(
+    records_a: List[Dict[str, Any]],
+    records_b: List[Dict[str, Any]],
+    n_resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Paired bootstrap test of the score difference (B - A) between two runs on the same cases.
+
+    Cases are paired on `case_id`; cases that are missing or unscored in either run are ignored.
+
+    Args:
+        records_a: Evaluated records of the baseline run (A)
+        records_b: Evaluated records of the challenger run (B)
+        n_resamples: Number of bootstrap resamples
+        confidence: Confidence level of the interval on the mean difference
+        seed: Seed of the random generator
+
+    Returns:
+        Dict with the mean difference, its confidence interval, the two-sided p-value
+        and the fraction of resamples where B beats A
+    """
+    scores_a = {r.get("case_id"): r["score"] for r in records_a if r.get("score") is not None}
+    pairs = [
+        (float(scores_a[r.get("case_id")]), float(r["score"]))
+        for r in records_b
+        if r.get("score") is not None and r.get("case_id") in scores_a
+    ]
+    if not pairs:
+        return {"n_pairs": 0, "mean_diff": None, "ci_low": None, "ci_high": None,
+                "p_value": None, "prob_b_better": None}
+
+    diffs = np.array([b - a for a, b in pairs], dtype=float)
+    rng = np.random.default_rng(seed)
+    means = _bootstrap_means(diffs, n_resamples, rng)
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.quantile(means, [alpha, 1.0 - alpha])
+    # Two-sided p-value of the null hypothesis "mean difference is 0"
+    p_value = min(1.0, 2.0 * min(float((means <= 0).mean()), float((means >= 0).mean())))
+    return {
+        "n_pairs": len(pairs),
+        "mean_a": round(float(np.mean([a for a, _ in pairs])), 4),
+        "mean_b": round(float(np.mean([b for _, b in pairs])), 4),
+        "mean_diff": round(float(diffs.mean()), 4),
+        "ci_low": round(float(low), 4),
+        "ci_high": round(float(high), 4),
+        "p_value": round(p_value, 4),
+        "prob_b_better": round(float((means > 0).mean()), 4)
+    }
+
+
+def summarize_pairwise(
+    records: List[Dict[str, Any]],
+    n_resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Win/tie/loss rates of candidate B against candidate A, with bootstrap confidence intervals.
+
+    Args:
+        records: Records of a pairwise evaluation, with a `verdict` of "A", "B" or "tie"
+        n_resamples: Number of bootstrap resamples
+        confidence: Confidence level of the intervals
+        seed: Seed of the random generator
+
+    Returns:
+        Dict with the win, tie and loss rates of B and the rate of verdicts for the first position
+    """
+    judged = [r for r in records if r.get("verdict") in ("A", "B", "tie")]
+    verdicts = [r["verdict"] for r in judged]
+    first_wins = [
+        1.0 if r["verdict"] == r.get("judge_order", "AB")[0] else 0.0
+        for r in judged if r["verdict"] != "tie"
+    ]
+    return {
+        "n_pairs": len(judged),
+        "n_errors": len(records) - len(judged),
+        "confidence": confidence,
+        "win_rate_b": bootstrap_ci([v == "B" for v in verdicts], n_resamples, confidence, seed),
+        "tie_rate": bootstrap_ci([v == "tie" for v in verdicts], n_resamples, confidence, seed),
+        "loss_rate_b": bootstrap_ci([v == "A" for v in verdicts], n_resamples, confidence, seed),
+        # Should stay close to 0.5: a strong deviation hints at a position bias of the judge
+        "first_position_win_rate": round(float(np.mean(first_wins)), 4) if first_wins else None
+    }
+
+
+def compare_result_files(
+    baseline_fname: str,
+    candidate_fname: str,
+    n_resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Run a paired bootstrap test between two result files and write the summary
+    in the `comparison` entry of the metadata of the candidate result file.
+    """
+    baseline = load_dataset(baseline_fname)
+    candidate = load_dataset(candidate_fname)
+
+    comparison = paired_bootstrap_test(
+        baseline["test_cases"],
+        candidate["test_cases"],
+        n_resamples=n_resamples,
+        confidence=confidence,
+        seed=seed
+    )
+    comparison = {"baseline": str(baseline_fname), "confidence": confidence, **comparison}
+
+    metadata = candidate["metadata"]
+    metadata["summary"] = aggregate_results(candidate["test_cases"], n_resamples, confidence, seed)
+    metadata["comparison"] = comparison
+    msg_type, msg = save_dataset(path_to_fname=candidate_fname,
+                                 dataset={"metadata": metadata, "test_cases": candidate["test_cases"]})
+    if msg_type == "error":
+        logger.error(msg)
+
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paired bootstrap comparison of two result files")
+    parser.add_argument("baseline", type=str, help="Result file of the baseline run (A)")
+    parser.add_argument("candidate", type=str, help="Result file of the challenger run (B), updated in place")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES, help="Number of bootstrap resamples")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE, help="Confidence level")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the random generator")
+    args = parser.parse_args()
+
+    result = compare_result_files(args.baseline, args.candidate,
+                                  n_resamples=args.resamples, confidence=args.confidence, seed=args.seed)
+    print(result)
@@ -1,25 +1,19 @@
-import time
 import streamlit as st
 from pathlib import Path
-import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import glob
-import inspect
-from models import create_model
-from evaluator import Evaluator
 
-from main import load_task_executor
 from lib.utils import load_config_files, get_available_tasks, load_dataset
+from lib.task_registry import get_task_registry
+from lib.sampling import sample_dataset
+from lib.jobs import FINISHED_STATUSES, EvaluationJob, RunningStats, get_job_manager, read_journal
 
 
 CANDIDATE_CONFIG_FILE = "candidate_model.yaml"
 EVALUATOR_CONFIG_FILE = "evaluator.yaml"
 TASKS_CONFIG_FILE = "tasks.yaml"
-
-
-def get_class_docstring(class_obj: Any) -> str:
-    """Extract docstring from the main class in a task file."""
-    return inspect.getdoc(class_obj) or "No documentation available"
+JOBS_REFRESH_S = 1.0  # refresh period of the job table, in seconds
+RESULT_COLUMNS = {'Case ID': str, 'Difficulty level': str, 'Score': float, 'Feedback': str, 'Latency (s)': float}
 
 
 def get_dataset_info(dataset_path: str) -> dict:
@@ -56,59 +50,181 @@ def get_datasets_for_task(task_type: str) -> List[str]:
     return selected_datasets
 
 
-def run_single_evaluation(
-    task_executor: Any,
-    model_config: dict,
-    evaluator_config: dict,
-    task_name: str,
-    test_cases: List[dict],
-    output_file: str
-) -> List[Dict[str, Any]]:
-    """Run evaluation for a single test case or a list of test cases."""
-                    # Create output directory
-    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+def result_rows(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows of the results table of a run."""
+    return [{
+        'Case ID': r.get('case_id', ''),
+        'Difficulty level': r.get('difficulty_level', ''),
+        'Score': r.get('score', 0),
+        'Feedback': r.get('feedback', ''),
+        'Latency (s)': ((r.get('usage') or {}).get('candidate') or {}).get('latency_s')
+    } for r in results]
 
-    try:
-        # Create model
-        try:
-            model = create_model(
-                model_name=model_config["model"]["name"],
-                model_type=model_config["model"]["type"],
-                **model_config.get("parameters", {})
-            )
-        except Exception as e:
-            st.error(f"Failed to create model: {str(e)}")
-            return []
 
-        # Create evaluator
-        try:
-            eval_model = create_model(
-                model_name=evaluator_config["model"]["name"],
-                model_type=evaluator_config["model"]["type"],
-                api_key_source=evaluator_config["model"]["api_key_source"],
-                **evaluator_config.get("parameters", {})
-            )
-            evaluator = Evaluator(eval_model, evaluator_config["evaluator_prompt"])
-        except Exception as e:
-            st.error(f"Failed to create evaluator: {str(e)}")
-            return []
-        # Create task runner
-        task_runner = task_executor(model)
-
-        # Run task
-        results = task_runner.run_task(test_cases)
-
-        # Run evaluation
-        evaluated_results = evaluator.evaluate_results(
-            results,
-            output_path=output_file
-        )
+def results_frame(rows: List[Dict[str, Any]]) -> Any:
+    """DataFrame of result rows, with fixed column types so that new rows can be appended with `add_rows`."""
+    import pandas as pd
 
-        return evaluated_results
+    frame = pd.DataFrame(rows, columns=list(RESULT_COLUMNS))
+    for column, dtype in RESULT_COLUMNS.items():
+        frame[column] = frame[column].astype(dtype) if dtype == float else frame[column].fillna("").astype(str)
+    return frame
+
+
+def show_results(results: List[Dict[str, Any]]) -> None:
+    """Show the scores, usage and latency of the records of a run."""
+    import pandas as pd
+    from lib.metrics import summarize_usage
+
+    # Create results DataFrame
+    results_df = results_frame(result_rows(results))
+
+    st.dataframe(results_df)
+
+    # Per-task totals of tokens and cost, and latency percentiles per role
+    usage_summary = summarize_usage(results)
+    if usage_summary:
+        st.subheader("Usage and Latency")
+        st.dataframe(pd.DataFrame([{
+            'Role': role,
+            'Calls': summary['calls'],
+            'Prompt tokens': summary['prompt_tokens'],
+            'Completion tokens': summary['completion_tokens'],
+            'Cost (USD)': summary.get('cost_usd'),
+            'Latency p50 (s)': summary.get('latency_s', {}).get('p50'),
+            'Latency p95 (s)': summary.get('latency_s', {}).get('p95'),
+            'Latency p99 (s)': summary.get('latency_s', {}).get('p99'),
+            'TTFT p50 (s)': summary.get('ttft_s', {}).get('p50'),
+            'Tokens/sec p50': summary.get('output_tokens_per_s', {}).get('p50')
+        } for role, summary in usage_summary.items()]))
+
+    # Display full results in an expandable section
+    with st.expander("Full Evaluation Results"):
+        st.json(results)
+
+
+def format_seconds(seconds: Optional[float]) -> str:
+    """Format a duration for the progress of a job."""
+    if seconds is None:
+        return "-"
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}m{seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    """One-line summary of the running statistics of a job."""
+    def fmt(value: Optional[float], digits: int = 2) -> str:
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    return (f"Mean score **{fmt(stats['mean_score'])}** · errors **{stats['n_errors']}** · "
+            f"latency p50 **{fmt(stats['latency_p50_s'], 3)}s** · p95 **{fmt(stats['latency_p95_s'], 3)}s**")
+
+
+def show_progress(job: EvaluationJob) -> None:
+    """Show the progress bar of a job: cases done, throughput, elapsed time and ETA."""
+    progress = job.progress()
+    throughput = f"{progress['cases_per_s']:.2f} cases/s" if progress["cases_per_s"] else "- cases/s"
+    st.progress(progress["fraction"], text=f"{progress['n_done']}/{progress['n_cases']} cases · {throughput} · "
+                                           f"elapsed {format_seconds(progress['elapsed_s'])} · "
+                                           f"ETA {format_seconds(progress['eta_s'])}")
+
+
+def live_state(job: EvaluationJob) -> Dict[str, Any]:
+    """Records read from the journal of a running job so far, kept across the reruns of the page."""
+    return st.session_state.setdefault(f"journal_{job.job_id}",
+                                       {"offset": 0, "frame": results_frame([]), "stats": RunningStats()})
 
-    except Exception as e:
-        st.error(f"Evaluation failed: {str(e)}")
-        return []
+
+def show_live_results(job: EvaluationJob, table: Optional[Any]) -> None:
+    """
+    Running statistics of the running job, and its new results appended to its table.
+
+    `table` is the results table of the job, created once per run of the page (see `jobs_panel`).
+    Each refresh only reads and parses the records added to the journal since the previous one,
+    and only sends them to the table, with `add_rows`.
+    """
+    import pandas as pd
+
+    if table is None:
+        # The job started after the last run of the page: rerun it to create the table
+        st.rerun()
+    state = live_state(job)
+    records, state["offset"] = read_journal(job.journal_path, state["offset"])
+    state["stats"].update(records)
+    st.markdown(format_stats(state["stats"].summary()))
+    if records:
+        new_rows = results_frame(result_rows(records))
+        table.add_rows(new_rows)
+        # Rows the table is created with at the next run of the page
+        state["frame"] = pd.concat([state["frame"], new_rows], ignore_index=True)
+
+
+def show_job(job: EvaluationJob, show_progress_bar: bool = True, table: Optional[Any] = None) -> None:
+    """Show the status and progress of a job, with a Cancel button while it is not finished, and its results table (see `show_live_results`)."""
+    progress = job.progress()
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        st.markdown(f"**{progress['task']}** · job {progress['job_id']} · {progress['status']}")
+        if show_progress_bar:
+            show_progress(job)
+    with col2:
+        if progress["status"] not in FINISHED_STATUSES:
+            st.button("Cancel", key=f"cancel_{job.job_id}", on_click=get_job_manager().cancel, args=(job.job_id,),
+                      disabled=job.cancel_event.is_set())
+
+    if progress["status"] == "running":
+        show_live_results(job, table)
+        return
+
+    st.session_state.pop(f"journal_{job.job_id}", None)
+    if progress["status"] == "failed":
+        st.error(f"Evaluation failed: {progress['error']}")
+    elif progress["status"] in FINISHED_STATUSES:
+        st.success(f"Evaluation {progress['status']}: {progress['n_done']}/{progress['n_cases']} test cases in "
+                   f"{format_seconds(progress['elapsed_s'])}. Saved in: {progress['output_file']}")
+        if job.results:
+            with st.expander("Results", expanded=False):
+                show_results(job.results)
+
+
+def jobs_panel(show_progress_bar: bool = True) -> None:
+    """
+    Table of the evaluation jobs, refreshed every second while a job is queued or running.
+
+    The results of the running jobs stream into their tables as their cases complete: the tables
+    are created outside of the refreshed fragment, which only appends the new rows to them.
+    """
+    manager = get_job_manager()
+    if not manager.list_jobs():
+        return
+    st.subheader("Evaluation Jobs")
+    if st.button("Clear finished jobs"):
+        manager.clear_finished()
+
+    # streamlit>=1.37 has st.fragment; earlier versions st.experimental_fragment
+    fragment = getattr(st, "fragment", None) or st.experimental_fragment
+    active = any(job.status not in FINISHED_STATUSES for job in manager.list_jobs())
+
+    @fragment(run_every=JOBS_REFRESH_S if active else None)
+    def jobs_table():
+        jobs = manager.list_jobs()
+        for job in jobs:
+            with st.container(border=True):
+                show_job(job, show_progress_bar, tables.get(job.job_id))
+        if active and all(job.status in FINISHED_STATUSES for job in jobs):
+            # Every job is finished: rerun the page once to stop polling
+            st.rerun()
+
+    # Results tables of the running jobs, below the fragment: created once per run of the page,
+    # the refreshes of the fragment only append the new rows to them
+    status_area = st.container()
+    tables = {}
+    for job in manager.list_jobs():
+        if job.status == "running":
+            st.caption(f"Results of job {job.job_id} ({job.task_name})")
+            tables[job.job_id] = st.dataframe(live_state(job)["frame"])
+    with status_area:
+        jobs_table()
 
 
 def automatic_evaluation_page():
@@ -195,10 +311,9 @@ def automatic_evaluation_page():
             
             # Show task documentation
             if selected_task:
-                # Load TaskExecutor: SummarizationTask, etc...
-                TaskExecutor = load_task_executor(module_path=tasks_config[selected_task]["import_lib"], 
-                                                   class_name=tasks_config[selected_task]["executor"])
-                doc = get_class_docstring(TaskExecutor)
+                # Docstring of the TaskExecutor (SummarizationTask, etc...), read without importing it
+                doc = get_task_registry().get_docstring(tasks_config[selected_task]["import_lib"],
+                                                        tasks_config[selected_task]["executor"])
                 with st.expander("Task Description", expanded=True):
                     st.markdown(doc)
             
@@ -252,6 +367,28 @@ def automatic_evaluation_page():
             value=True,
             help="Display progress during evaluation"
         )
+        stream_responses = st.checkbox(
+            "Stream Responses",
+            value=False,
+            help="Stream the candidate model responses to measure time-to-first-token and tokens/sec"
+        )
+        sample_cases = st.checkbox(
+            "Sample Test Cases",
+            value=False,
+            help="Smoke run on a reproducible stratified subset of the test cases (by difficulty_level and sub_category)"
+        )
+        sample_size, sample_per_stratum, sample_seed = None, None, 0
+        if sample_cases:
+            sample_col1, sample_col2, sample_col3 = st.columns(3)
+            with sample_col1:
+                sample_size = st.number_input("Sample size", min_value=1, value=10, step=1,
+                                              help="Number of test cases of the subset") or None
+            with sample_col2:
+                sample_per_stratum = st.number_input("Max cases per stratum", min_value=0, value=0, step=1,
+                                                     help="0 for no limit") or None
+            with sample_col3:
+                sample_seed = st.number_input("Seed", min_value=0, value=0, step=1,
+                                              help="The same seed picks the same subset")
     
     # Validate settings before enabling run button
     can_run = selected_task and st.session_state.get('selected_dataset')
@@ -259,48 +396,32 @@ def automatic_evaluation_page():
     # Run Evaluation Button
     if st.button("Run Evaluation", type="primary", disabled=not can_run):
         try:
-            with st.spinner("Running evaluation..."):
-                progress_bar = st.progress(0)
-                st.write(f"Evaluating **{selected_task}** using dataset: **{st.session_state.selected_dataset}**")
-                
-                # Load dataset
-                dataset = load_dataset(st.session_state.selected_dataset)
-                # Run evaluation
-                try:
-                    start_timer = time.time()
-                    results = run_single_evaluation(
-                        task_executor=TaskExecutor,
-                        model_config=model_config,
-                        evaluator_config=evaluator_config,
-                        task_name=selected_task,
-                        test_cases=test_cases,
-                        output_file=output_file
-                    )
-                    elapsed_time = time.time() - start_timer
-                    elapsed_rate = elapsed_time / num_test_cases
+            # Load dataset
+            dataset = load_dataset(st.session_state.selected_dataset)
+            if sample_cases:
+                dataset = sample_dataset(dataset, size=sample_size, per_stratum=sample_per_stratum,
+                                         seed=int(sample_seed))
+                sampling = dataset["metadata"]["sampling"]
+                # Label the results of the subset, so that they are not confused with a full run
+                output_file = str(Path(output_file).with_suffix(f".{sampling['label']}.yaml"))
+                st.info(f"Sampled run ({sampling['label']}): {sampling['n_cases']} of "
+                        f"{sampling['n_cases_total']} test cases from {sampling['n_strata']} strata")
 
-                    # Show results
-                    st.success(f"Evaluation completed! RunTime:{elapsed_time:.2f} sec ({elapsed_rate:.2f} secs per test case). Saved in: {output_file}")
-                    st.subheader("Results")
-                    
-                    # Create results DataFrame
-                    results_df = pd.DataFrame([{
-                        'Case ID': r.get('case_id', ''),
-                        'Difficulty level': r.get('difficulty_level', ''),
-                        'Score': r.get('score', 0),
-                        'Feedback': r.get('feedback', '')
-                    } for r in results])
-                    
-                    st.dataframe(results_df)
-                    
-                    # Display full results in an expandable section
-                    with st.expander("Full Evaluation Results"):
-                        st.json(results)
-                    
-                except Exception as e:
-                    st.error(f"Error during evaluation: {str(e)}")
-                
-                progress_bar.progress(1.0)
-                
+            # Queue the run as a background job: the page stays responsive while it runs
+            job = EvaluationJob(
+                task_name=selected_task,
+                task_config=tasks_config[selected_task],
+                model_config=model_config,
+                evaluator_config=evaluator_config,
+                test_cases=dataset["test_cases"],
+                output_file=output_file,
+                dataset_metadata=dataset.get("metadata"),
+                stream=stream_responses
+            )
+            get_job_manager().submit(job)
+            st.success(f"Queued evaluation of **{selected_task}** on **{st.session_state.selected_dataset}** "
+                       f"(job {job.job_id}, {job.n_cases} test cases)")
         except Exception as e:
-            st.error(f"Error loading dataset: {str(e)}")
\ No newline at end of file
+            st.error(f"Error loading dataset: {str(e)}")
+
+    jobs_panel(show_progress_bar)
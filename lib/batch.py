@@ -0,0 +1,252 @@
+import os
+import json
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field, PrivateAttr
+
+from lib.cache import make_key
+
+
+logger = logging.getLogger(__name__)
+
+
+BATCH_ROLES = ("candidate", "judge")
+BATCH_URL = "/v1/chat/completions"
+# Generation parameters of the model configurations that are part of a chat completion request
+BATCH_PARAMETERS = ("temperature", "top_p", "max_tokens", "max_completion_tokens", "seed", "stop",
+                    "presence_penalty", "frequency_penalty")
+BATCH_PENDING = "[[batch pending: {custom_id}]]"
+
+_OPENAI_ROLES = {"system": "system", "human": "user", "ai": "assistant", "tool": "tool"}
+
+
+class BatchResponseError(RuntimeError):
+    """Raised when the batch response of a request is missing or failed."""
+
+
+def to_openai_messages(messages: List[BaseMessage]) -> List[Dict[str, str]]:
+    """Convert LangChain messages to the messages of a chat completion request."""
+    return [{"role": _OPENAI_ROLES.get(m.type, "user"), "content": m.content} for m in messages]
+
+
+def batch_body(model_name: str, messages: List[BaseMessage], parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Body of the chat completion request of a model call."""
+    body = {"model": model_name, "messages": to_openai_messages(messages)}
+    body.update({k: v for k, v in parameters.items() if k in BATCH_PARAMETERS})
+    return body
+
+
+def batch_custom_id(role: str, body: Dict[str, Any]) -> str:
+    """
+    Identify a request by its role and the hash of its body.
+
+    The id only depends on the content of the request, so the run of the second phase
+    finds the response of each call, and identical requests are sent only once.
+    """
+    return f"{role}-{make_key(body)[:32]}"
+
+
+class BatchRecorder(BaseChatModel):
+    """
+    Chat model that records the requests of a run instead of calling a backend (phase 1).
+
+    Every call is stored as a request line in the OpenAI batch format, and answered with
+    a placeholder, so that the task executors and the evaluator run unchanged.
+    """
+
+    role: str = "candidate"
+    model: str
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+    requests: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "batch-recorder"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        body = batch_body(self.model, messages, self.parameters)
+        custom_id = batch_custom_id(self.role, body)
+        with self._lock:
+            self.requests.setdefault(custom_id, {"custom_id": custom_id, "method": "POST",
+                                                 "url": BATCH_URL, "body": body})
+        message = AIMessage(content=BATCH_PENDING.format(custom_id=custom_id))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class BatchReplayModel(BaseChatModel):
+    """
+    Chat model that answers from the ingested batch responses, without live calls (phase 2).
+
+    Token counts of the responses are reported as usage metadata, so that the cost of
+    the run is computed as for live calls.
+    """
+
+    role: str = "candidate"
+    model: str
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+    responses: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "batch-replay"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        custom_id = batch_custom_id(self.role, batch_body(self.model, messages, self.parameters))
+        entry = self.responses.get(custom_id)
+        if entry is None:
+            raise BatchResponseError(f"No batch response for request {custom_id}")
+        if entry.get("error"):
+            raise BatchResponseError(f"Batch request {custom_id} failed: {entry['error']}")
+
+        usage = entry.get("usage") or {}
+        usage_metadata = None
+        if "prompt_tokens" in usage:
+            usage_metadata = {
+                "input_tokens": usage["prompt_tokens"],
+                "output_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", usage["prompt_tokens"] + usage.get("completion_tokens", 0)),
+                "input_token_details": {
+                    "cache_read": (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+                }
+            }
+        message = AIMessage(content=entry["content"], usage_metadata=usage_metadata)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def write_batch_requests(path: str | Path, requests: Iterable[Dict[str, Any]]) -> int:
+    """Write request lines to a JSONL batch file, and return the number of requests."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with open(path, "w") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def parse_batch_response(line: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Parse a line of a batch output file: content and usage of the completion, or the error.
+
+    Args:
+        line: Output line in the OpenAI batch format (`custom_id`, `response`, `error`)
+
+    Returns:
+        Dict with `content`, `usage` and `error` (None if the request succeeded)
+    """
+    if line.get("error"):
+        return {"content": None, "usage": None, "error": line["error"]}
+
+    response = line.get("response") or {}
+    if response.get("status_code", 200) != 200:
+        return {"content": None, "usage": None, "error": f"HTTP {response.get('status_code')}: {response.get('body')}"}
+
+    body = response.get("body") or {}
+    try:
+        content = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return {"content": None, "usage": None, "error": f"Unexpected response body: {body}"}
+    return {"content": content, "usage": body.get("usage"), "error": None}
+
+
+def load_batch_responses(paths: Iterable[str | Path]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load batch output files, keyed by `custom_id`.
+
+    Args:
+        paths: JSONL output files of the candidate and/or judge batches
+
+    Returns:
+        Dict mapping each custom_id to its parsed response (see `parse_batch_response`)
+    """
+    responses = {}
+    for path in paths:
+        with open(path) as f:
+            for i, raw in enumerate(f, start=1):
+                if not raw.strip():
+                    continue
+                try:
+                    line = json.loads(raw)
+                    responses[line["custom_id"]] = parse_batch_response(line)
+                except (json.JSONDecodeError, KeyError) as e:
+                    logger.warning(f"Skipping invalid line {i} of {path}: {e}")
+    n_errors = sum(1 for r in responses.values() if r["error"])
+    logger.info(f"Loaded {len(responses)} batch responses ({n_errors} errors)")
+    return responses
+
+
+def replay_batch(
+    requests_path: str | Path,
+    responses_path: str | Path,
+    base_url: str,
+    api_key: Optional[str] = None,
+    timeout: float = 600.0
+) -> int:
+    """
+    Send the requests of a batch file one by one to an OpenAI-compatible server, and write
+    the responses in the batch output format (e.g. to replay a batch through a local server).
+
+    Args:
+        requests_path: JSONL batch file written in phase 1
+        responses_path: JSONL output file, ingested in phase 2
+        base_url: Base URL of the server (e.g. http://localhost:11434 for Ollama)
+        api_key: Optional bearer token
+        timeout: Read timeout of a request in seconds
+
+    Returns:
+        Number of requests sent
+    """
+    import requests
+
+    session = requests.Session()
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    n = 0
+    with open(requests_path) as f_in, open(responses_path, "w") as f_out:
+        for raw in f_in:
+            if not raw.strip():
+                continue
+            request = json.loads(raw)
+            line = {"id": f"replay-{n}", "custom_id": request["custom_id"], "response": None, "error": None}
+            try:
+                response = session.post(f"{base_url.rstrip('/')}{request['url']}", json=request["body"],
+                                        headers=headers, timeout=(5.0, timeout))
+                line["response"] = {"status_code": response.status_code, "body": response.json()}
+            except Exception as e:
+                line["error"] = {"message": str(e)}
+            f_out.write(json.dumps(line, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a batch file through an OpenAI-compatible server")
+    parser.add_argument("requests", type=str, help="JSONL batch file (phase 1)")
+    parser.add_argument("responses", type=str, help="JSONL output file (ingested in phase 2)")
+    parser.add_argument("--base-url", type=str, default="http://localhost:11434", help="Base URL of the server")
+    parser.add_argument("--api-key-env", type=str, default=None, help="Environment variable holding the API key")
+    args = parser.parse_args()
+
+    api_key = os.getenv(args.api_key_env) if args.api_key_env else None
+    n_requests = replay_batch(args.requests, args.responses, args.base_url, api_key=api_key)
+    print(f"Replayed {n_requests} requests into {args.responses}")
@@ -0,0 +1,126 @@
+import json
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CACHE_PATH = ".cache/llmevalforge.sqlite"
+
+
+def make_key(*parts: Any) -> str:
+    """Return a stable hash for a sequence of JSON-serializable values."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def model_signature(model_config: Dict[str, Any]) -> str:
+    """Identify a model configuration (type, name and generation parameters)."""
+    model = model_config.get("model", {})
+    return make_key(model.get("type"), model.get("name"), dict(model_config.get("parameters", {}) or {}))
+
+
+class ResponseCache:
+    """
+    Persistent key/value cache of model responses, stored in a SQLite file.
+
+    Entries are grouped by namespace (e.g. "responses" for candidate model outputs,
+    "verdicts" for judge outputs). The cache is safe to share between threads.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_CACHE_PATH):
+        """Open (or create) the cache file."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._conn.commit()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        """Store a JSON-serializable value."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value) VALUES (?, ?, ?)",
+                (namespace, key, json.dumps(value, default=str, ensure_ascii=False))
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def response_key(task_runner: Any, model_key: str, test_case: Dict[str, Any]) -> str:
+    """Cache key of the response of a model to a test case for a given task executor."""
+    return make_key(
+        # Runners executing the cases elsewhere (e.g. lib.work_queue) name the executor they stand for
+        getattr(task_runner, "executor_name", None) or type(task_runner).__name__,
+        model_key,
+        test_case.get("system_prompt", ""),
+        test_case.get("instruction", "")
+    )
+
+
+def run_task_cached(
+    task_runner: Any,
+    test_cases: List[Dict[str, Any]],
+    cache: Optional[ResponseCache],
+    model_key: str
+) -> List[Dict[str, Any]]:
+    """
+    Run a task executor, reusing the cached responses of the model and caching the new ones.
+
+    Args:
+        task_runner: Task executor instance
+        test_cases: List of test cases
+        cache: Response cache (no caching if None)
+        model_key: Signature of the candidate model (see `model_signature`)
+
+    Returns:
+        List of results with model responses, in the order of `test_cases`
+    """
+    if cache is None or getattr(task_runner, "cache", None) is not None:
+        # No caching, or the executor looks up its own cache per case
+        return task_runner.run_task(dataset_path_or_cases=test_cases)
+
+    keys = [response_key(task_runner, model_key, case) for case in test_cases]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(test_cases)
+    missing = []
+    for i, (case, key) in enumerate(zip(test_cases, keys)):
+        cached = cache.get("responses", key)
+        if cached is None:
+            missing.append(i)
+        else:
+            results[i] = {**case, "model_response": cached, "score": None, "feedback": None,
+                          "usage": {"candidate": {"cached": True}}}
+
+    logger.info(f"Response cache: {len(test_cases) - len(missing)} hits, {len(missing)} misses")
+    if missing:
+        new_results = task_runner.run_task(dataset_path_or_cases=[test_cases[i] for i in missing])
+        for i, result in zip(missing, new_results):
+            results[i] = result
+            response = result.get("model_response")
+            if isinstance(response, str) and not response.startswith("ERROR:"):
+                cache.set("responses", keys[i], response)
+
+    return results
@@ -3,6 +3,7 @@ import textwrap
 from typing import Dict, Any, Tuple
 
 from lib.utils import load_config_files, save_config
+from models import clear_model_registry
 
 
 def create_field_label(label: str, field_descriptions: dict) -> str:
@@ -85,6 +86,9 @@ def edit_candidate_model_config(configs: Dict[str, Any], fname="candidate_model.
                 new_config["parameters"] = parameters
                 msg_type, msg = save_config(fname, new_config)
                 st.success(msg) if msg_type == "success" else st.error(msg)
+                if msg_type == "success":
+                    # Model clients built from the previous settings must not be reused
+                    clear_model_registry()
                 st.session_state.model_edit_mode = False
                 st.experimental_rerun()
 
@@ -155,6 +159,9 @@ def edit_evaluator_config(configs: Dict[str, Any], fname="evaluator.yaml"):
                 new_config["parameters"] = parameters
                 msg_type, msg = save_config(fname, new_config)
                 st.success(msg) if msg_type == "success" else st.error(msg)
+                if msg_type == "success":
+                    # Model clients built from the previous settings must not be reused
+                    clear_model_registry()
                 st.session_state.model_edit_mode = False
                 st.experimental_rerun()
 
@@ -213,6 +220,9 @@ def edit_tasks_config(configs: Dict[str, Any], fname="tasks.yaml"):
                 new_config["tasks"] = tasks
                 msg_type, msg = save_config(fname, new_config)
                 st.success(msg) if msg_type == "success" else st.error(msg)
+                if msg_type == "success":
+                    # Model clients built from the previous settings must not be reused
+                    clear_model_registry()
                 st.session_state.model_edit_mode = False
                 st.experimental_rerun()
 
@@ -1,7 +1,6 @@
 import streamlit as st
 import yaml
 import json
-import pandas as pd
 from pathlib import Path
 from typing import Dict, Any
 from datetime import date
@@ -0,0 +1,234 @@
+import re
+import zlib
+import logging
+import argparse
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+DEDUP_FIELDS = ("system_prompt", "instruction", "expected_response")
+DEFAULT_THRESHOLD = 0.8
+NUM_PERM = 128
+SHINGLE_SIZE = 3  # words
+_PRIME = np.uint64((1 << 31) - 1)  # Mersenne prime, (a * x + b) stays below 2^63 for 32-bit x
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def case_text(case: Dict[str, Any], fields: Sequence[str] = DEDUP_FIELDS) -> str:
+    """Concatenate the fields of a test case that identify its content."""
+    return "\n".join(str(case.get(field) or "") for field in fields)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the word n-grams of a text (lowercased, punctuation ignored)."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)))
+
+
+class MinHasher:
+    """MinHash signatures of sets of 32-bit shingle hashes, with `num_perm` seeded hash functions."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 0):
+        """Draw the parameters of the hash functions."""
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        """MinHash signature of a set of shingle hashes."""
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % _PRIME).min(axis=1)
+
+
+def lsh_parameters(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """
+    Choose the number of bands and rows per band of the LSH index for a similarity threshold.
+
+    Pairs with a Jaccard similarity s become candidates with probability 1 - (1 - s^rows)^bands,
+    whose steepest point is close to (1 / bands)^(1 / rows). The steepest point is kept below
+    the threshold, so that few near-duplicates are missed; the extra candidates are discarded
+    when their estimated similarity is checked.
+    """
+    best = (num_perm, 1)
+    best_point = 0.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        point = (1.0 / bands) ** (1.0 / rows)
+        if best_point < point <= threshold:
+            best, best_point = (bands, rows), point
+    return best
+
+
+def find_duplicate_clusters(
+    texts: Sequence[str],
+    threshold: float = DEFAULT_THRESHOLD,
+    num_perm: int = NUM_PERM,
+    seed: int = 0
+) -> List[List[int]]:
+    """
+    Cluster near-duplicate texts with MinHash and locality-sensitive hashing.
+
+    Candidate pairs sharing an LSH bucket are kept if their estimated Jaccard similarity
+    is at least `threshold`, and clusters are the connected components of the kept pairs.
+
+    Args:
+        texts: Texts to compare
+        threshold: Minimum estimated Jaccard similarity of the word shingles
+        num_perm: Number of hash functions of the signatures
+        seed: Seed of the hash functions
+
+    Returns:
+        Clusters of 2 or more indices, each sorted, ordered by their first index
+    """
+    hasher = MinHasher(num_perm, seed)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        signatures[i] = hasher.signature(shingles(text))
+
+    bands, rows = lsh_parameters(threshold, num_perm)
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        band_signatures = signatures[:, band * rows:(band + 1) * rows]
+        for i in range(len(texts)):
+            buckets.setdefault(band_signatures[i].tobytes(), []).append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            for j, other in enumerate(members[1:], start=1):
+                for first in members[:j]:
+                    root_first, root_other = find(first), find(other)
+                    if root_first == root_other:
+                        break
+                    similarity = float((signatures[first] == signatures[other]).mean())
+                    if similarity >= threshold:
+                        parent[max(root_first, root_other)] = min(root_first, root_other)
+                        break
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(texts)):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted((c for c in clusters.values() if len(c) > 1), key=lambda c: c[0])
+
+
+def split_duplicates(
+    test_cases: List[Dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD
+) -> Tuple[List[Dict[str, Any]], Dict[int, int]]:
+    """
+    Keep one representative case (the first) per near-duplicate cluster.
+
+    Returns:
+        Tuple of the cases to run, and a dict mapping the index of each skipped case
+        to the index of its representative in `test_cases`
+    """
+    clusters = find_duplicate_clusters([case_text(c) for c in test_cases], threshold)
+    duplicates = {member: cluster[0] for cluster in clusters for member in cluster[1:]}
+    return [c for i, c in enumerate(test_cases) if i not in duplicates], duplicates
+
+
+def copy_duplicate_results(
+    test_cases: List[Dict[str, Any]],
+    results: List[Dict[str, Any]],
+    duplicates: Dict[int, int]
+) -> List[Dict[str, Any]]:
+    """
+    Rebuild the results of all the cases from the results of the representatives.
+
+    The results of a representative (response, score, feedback) are copied to the members of
+    its cluster, flagged with `duplicate_of`; they hold no usage since no model call was made.
+
+    Args:
+        test_cases: All the test cases, in order
+        results: Results of the representatives, in the order of `test_cases` (see `split_duplicates`)
+        duplicates: Skipped case index -> representative index
+
+    Returns:
+        One result per test case, in the order of `test_cases`
+    """
+    representatives = [i for i in range(len(test_cases)) if i not in duplicates]
+    if len(results) == len(representatives):
+        by_index = dict(zip(representatives, results))
+    else:
+        # Adaptive runs return a subset of the representatives: match them on case_id
+        by_case_id = {r.get("case_id"): r for r in results}
+        by_index = {i: by_case_id[test_cases[i].get("case_id")] for i in representatives
+                    if test_cases[i].get("case_id") in by_case_id}
+
+    full_results = []
+    for i, case in enumerate(test_cases):
+        source = by_index.get(duplicates.get(i, i))
+        if source is None:
+            continue
+        if i not in duplicates:
+            full_results.append(source)
+            continue
+        full_results.append({
+            **case,
+            **{k: source[k] for k in ("model_response", "score", "feedback") if k in source},
+            "duplicate_of": source.get("case_id")
+        })
+    return full_results
+
+
+def find_dataset_duplicates(
+    dataset_files: Iterable[str],
+    threshold: float = DEFAULT_THRESHOLD
+) -> List[List[Dict[str, Any]]]:
+    """
+    Report the near-duplicate clusters across dataset files.
+
+    Returns:
+        List of clusters, each a list of {"dataset", "case_id"} members
+    """
+    from lib.utils import load_dataset
+
+    members, texts = [], []
+    for fname in dataset_files:
+        for case in load_dataset(fname)["test_cases"]:
+            members.append({"dataset": str(fname), "case_id": case.get("case_id")})
+            texts.append(case_text(case))
+    logger.info(f"Fingerprinting {len(texts)} cases")
+    return [[members[i] for i in cluster] for cluster in find_duplicate_clusters(texts, threshold)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report near-duplicate test cases across datasets (MinHash/LSH)")
+    parser.add_argument("paths", nargs="*", default=["datasets"], help="Dataset files or directories")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum Jaccard similarity of the word shingles of two cases")
+    parser.add_argument("--output", type=str, default=None, help="Save the clusters in this YAML file")
+    args = parser.parse_args()
+
+    files = []
+    for path in map(Path, args.paths):
+        files.extend(sorted(path.rglob("*.yaml")) if path.is_dir() else [path])
+    clusters = find_dataset_duplicates(files, args.threshold)
+
+    for n, cluster in enumerate(clusters, start=1):
+        print(f"Cluster {n}: " + ", ".join(f"{m['dataset']}#{m['case_id']}" for m in cluster))
+    print(f"{len(clusters)} near-duplicate clusters, {sum(len(c) - 1 for c in clusters)} redundant cases")
+
+    if args.output:
+        from lib.utils import save_dataset
+        save_dataset(path_to_fname=args.output,
+                     dataset={"metadata": {"threshold": args.threshold, "files": [str(f) for f in files]},
+                              "clusters": clusters})
@@ -0,0 +1,192 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_MAX_EXTRA_LOAD = 0.1  # at most 10% more calls than without hedging
+MIN_SAMPLES = 20  # latencies observed before the first hedge
+LATENCY_WINDOW = 500  # latencies kept to compute the percentile
+
+
+class HedgePolicy:
+    """
+    Hedged model calls, to cut the tail latency of straggler requests.
+
+    A call that is still running after the `percentile` of the latencies observed so far is
+    duplicated, and the first response of the two is used. Hedges are capped to `max_extra_load`
+    duplicate calls per call, so that a slow backend is not overloaded. The losing call is
+    cancelled where possible: a streamed response stops being read (which closes the connection),
+    while a blocking call runs to completion in the background and its response is dropped.
+
+    The policy is shared by the calls of a task, or of the tasks using the same judge; it is safe
+    to use from several threads. Each task brackets its calls with `open` and `close`, and the
+    threads are released when the last task still running closes the policy (they are started
+    again by the next call).
+    """
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        max_extra_load: float = DEFAULT_MAX_EXTRA_LOAD,
+        min_samples: int = MIN_SAMPLES,
+        window: int = LATENCY_WINDOW,
+        max_workers: int = 1
+    ):
+        """
+        Initialize the policy.
+
+        Args:
+            percentile: Percentile of the observed latencies after which a call is hedged
+            max_extra_load: Maximum ratio of hedged calls to calls
+            min_samples: Number of latencies observed before hedging starts
+            window: Number of most recent latencies used to compute the percentile
+            max_workers: Number of calls made concurrently by the caller
+        """
+        if not 0 < percentile < 100:
+            raise ValueError(f"percentile must be between 0 and 100, got {percentile}")
+        self.percentile = percentile
+        self.max_extra_load = max(0.0, max_extra_load)
+        self.min_samples = max(1, min_samples)
+        self.latencies: deque = deque(maxlen=window)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._max_workers = max(1, max_workers)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._users = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Delay after which a running call is hedged, or None until enough latencies were observed."""
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        rank = min(len(ordered) - 1, int(round(self.percentile / 100 * (len(ordered) - 1))))
+        return ordered[rank]
+
+    def _acquire_hedge(self) -> bool:
+        """Reserve a hedge if the budget of extra calls allows it."""
+        with self._lock:
+            if self.hedges + 1 > self.max_extra_load * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def _record(self, latency: float, hedge_won: bool = False) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def _submit(self, *args: Any, **kwargs: Any) -> Future:
+        """Submit a call to the thread pool, started on first use (also after `close`)."""
+        with self._lock:
+            if self._pool is None:
+                # A primary and a hedge per concurrent call, plus losers still running in the background
+                self._pool = ThreadPoolExecutor(max_workers=4 * self._max_workers, thread_name_prefix="hedge")
+            return self._pool.submit(*args, **kwargs)
+
+    def open(self) -> None:
+        """Register a task using the policy, until it calls `close`."""
+        with self._lock:
+            self._users += 1
+
+    def close(self) -> None:
+        """
+        Release the policy at the end of a task. When no other task uses it, the thread pool is shut
+        down: pending calls are cancelled, running losers are abandoned.
+        """
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users:
+                return
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts of calls, hedges and hedges answering first."""
+        with self._lock:
+            return {"calls": self.calls, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
+
+    @staticmethod
+    def _call(
+        runnable: Any,
+        inputs: Any,
+        stream: bool,
+        cancel: threading.Event,
+        call_limit: Optional[threading.Semaphore]
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """A call of `invoke`, holding `call_limit` if set; skipped if it lost while waiting for it."""
+        from lib.metrics import invoke_with_usage
+
+        with call_limit or nullcontext():
+            if cancel.is_set():
+                return None, {"cancelled": True}
+            return invoke_with_usage(runnable, inputs, stream=stream, cancel=cancel)
+
+    def invoke(
+        self,
+        runnable: Any,
+        inputs: Any,
+        stream: bool = False,
+        call_limit: Optional[threading.Semaphore] = None
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Invoke a model or chain, with a hedged duplicate call if it is slow (see `invoke_with_usage`).
+
+        `call_limit` is an optional semaphore capping the model calls in flight: the call and
+        its hedge each hold it while they run.
+
+        Returns:
+            Tuple of the first response and its usage record. The latency is measured from the
+            start of the first call; hedged calls are flagged with `hedged` and `hedge_won`.
+        """
+        with self._lock:
+            self.calls += 1
+        delay = self.hedge_delay()
+        start = time.perf_counter()
+        primary_cancel = threading.Event()
+        primary = self._submit(self._call, runnable, inputs, stream, primary_cancel, call_limit)
+
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._acquire_hedge():
+            response, usage = primary.result()
+            self._record(usage["latency_s"])
+            return response, usage
+
+        logger.debug(f"Hedging a call running for more than {delay:.3f}s")
+        hedge_cancel = threading.Event()
+        hedge = self._submit(self._call, runnable, inputs, stream, hedge_cancel, call_limit)
+        cancels = {primary: primary_cancel, hedge: hedge_cancel}
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for winner in done:
+                if winner.exception() is not None:
+                    error = error or winner.exception()
+                    continue
+                self._cancel(list(pending), cancels)
+                response, usage = winner.result()
+                # Latency seen by the caller, from the start of the first call
+                latency = round(time.perf_counter() - start, 4)
+                self._record(latency, hedge_won=winner is hedge)
+                return response, {**usage, "latency_s": latency, "hedged": True, "hedge_won": winner is hedge}
+        raise error
+
+    @staticmethod
+    def _cancel(losers: list, cancels: Dict[Future, threading.Event]) -> None:
+        """Cancel the losing calls: not started, or streamed (stop reading the response)."""
+        for loser in losers:
+            loser.cancel()
+            cancels[loser].set()
@@ -0,0 +1,298 @@
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+
+def journal_path(output_file: str) -> Path:
+    """Path of the per-case journal of a run, next to its results file."""
+    return Path(output_file).with_suffix(".journal.jsonl")
+
+
+def read_journal(path: str | Path, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Read the records appended to a journal since `offset`.
+
+    Args:
+        path: Path of the journal
+        offset: Position in bytes of the first unread record
+
+    Returns:
+        Tuple of the new records and the offset of the next unread record. A line still
+        being written (without its trailing newline) is left for the next read.
+    """
+    path = Path(path)
+    if not path.exists():
+        return [], offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    records = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+    return records, offset + end
+
+
+def is_error(record: Dict[str, Any]) -> bool:
+    """Check if the candidate call or the judge of a record failed."""
+    return (str(record.get("model_response", "")).startswith("ERROR:")
+            or str(record.get("feedback") or "").startswith("Evaluation error:"))
+
+
+class RunningStats:
+    """Running mean score, error count and candidate latency percentiles of the records of a run."""
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.n_records = 0
+        self.n_errors = 0
+        self.scores: List[float] = []
+        self.latencies: List[float] = []
+
+    def update(self, records: List[Dict[str, Any]]) -> None:
+        """Add new records to the statistics."""
+        for record in records:
+            self.n_records += 1
+            self.n_errors += is_error(record)
+            if record.get("score") is not None:
+                self.scores.append(float(record["score"]))
+            latency = ((record.get("usage") or {}).get("candidate") or {}).get("latency_s")
+            if latency is not None:
+                self.latencies.append(float(latency))
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentile of the candidate latencies (nearest rank), or None before the first one."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    def summary(self) -> Dict[str, Any]:
+        """Snapshot of the statistics."""
+        return {
+            "n_records": self.n_records,
+            "mean_score": sum(self.scores) / len(self.scores) if self.scores else None,
+            "n_errors": self.n_errors,
+            "latency_p50_s": self.percentile(50),
+            "latency_p95_s": self.percentile(95)
+        }
+
+
+class EvaluationJob:
+    """
+    An evaluation run of a task on a list of test cases, executed in the background.
+
+    The job runs the cases in chunks of `max_workers` (candidate, then judge), so that its
+    progress is updated per case and a cancellation stops it between two chunks. The records
+    of each chunk are appended to a JSONL journal (see `journal_path`) as soon as they are
+    judged, so that the UI can show them while the job runs; the journal is removed once the
+    results file is saved.
+    """
+
+    def __init__(
+        self,
+        task_name: str,
+        task_config: Dict[str, Any],
+        model_config: Dict[str, Any],
+        evaluator_config: Dict[str, Any],
+        test_cases: List[Dict[str, Any]],
+        output_file: str,
+        dataset_metadata: Optional[Dict[str, Any]] = None,
+        stream: bool = False
+    ):
+        """Initialize a queued job."""
+        self.job_id = uuid.uuid4().hex[:8]
+        self.task_name = task_name
+        self.task_config = task_config
+        self.model_config = model_config
+        self.evaluator_config = evaluator_config
+        self.test_cases = test_cases
+        self.output_file = output_file
+        self.journal_path = journal_path(output_file)
+        self.dataset_metadata = dict(dataset_metadata or {})
+        self.stream = stream
+
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.results: List[Dict[str, Any]] = []
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def n_cases(self) -> int:
+        return len(self.test_cases)
+
+    @property
+    def n_done(self) -> int:
+        with self._lock:
+            return len(self.results)
+
+    def cancel(self) -> None:
+        """Request the cancellation of the job: a queued job is skipped, a running job stops after its current chunk."""
+        self.cancel_event.set()
+
+    def progress(self) -> Dict[str, Any]:
+        """
+        Snapshot of the state of the job.
+
+        Returns:
+            Dict with the status, number of cases done, elapsed time, throughput (cases/s)
+            and estimated time to completion (seconds)
+        """
+        n_done = self.n_done
+        elapsed = None
+        throughput = None
+        eta = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            if n_done and elapsed > 0:
+                throughput = n_done / elapsed
+                if self.status == "running":
+                    eta = (self.n_cases - n_done) / throughput
+        return {
+            "job_id": self.job_id,
+            "task": self.task_name,
+            "status": self.status,
+            "n_done": n_done,
+            "n_cases": self.n_cases,
+            "fraction": n_done / self.n_cases if self.n_cases else 1.0,
+            "elapsed_s": elapsed,
+            "cases_per_s": throughput,
+            "eta_s": eta,
+            "output_file": self.output_file,
+            "error": self.error
+        }
+
+    def run(self) -> None:
+        """Run the job in the calling thread (see `JobManager`)."""
+        from main import create_candidate_model, create_judge_model, create_task_runner, load_task_executor
+        from evaluator import Evaluator, judge_options
+        from lib.aggregation import aggregate_results
+        from lib.metrics import apply_pricing, summarize_usage
+        from lib.ollama_utils import reset_ollama_probes
+        from lib.utils import save_dataset
+
+        self.status = "running"
+        self.started_at = time.time()
+        # Give an Ollama server marked unhealthy during a previous run another chance
+        reset_ollama_probes()
+
+        model = create_candidate_model(self.model_config)
+        evaluator = Evaluator(create_judge_model(self.evaluator_config), self.evaluator_config["evaluator_prompt"],
+                              **judge_options(self.evaluator_config))
+        ExecutorClass = load_task_executor(module_path=self.task_config["import_lib"],
+                                           class_name=self.task_config["executor"])
+        task_runner = create_task_runner(ExecutorClass, model, self.task_config, stream=self.stream)
+
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        self.journal_path.write_text("")
+        chunk_size = getattr(task_runner, "max_workers", 1)
+        for start in range(0, self.n_cases, chunk_size):
+            if self.cancel_event.is_set():
+                self.status = "cancelled"
+                break
+            chunk = task_runner.run_task(self.test_cases[start:start + chunk_size])
+            chunk = evaluator.evaluate_results(chunk, output_path=None)
+            apply_pricing(chunk, "candidate", self.model_config.get("pricing"))
+            apply_pricing(chunk, "judge", self.evaluator_config.get("pricing"))
+            with open(self.journal_path, "a", encoding="utf-8") as journal:
+                journal.write("".join(json.dumps(record, default=str, ensure_ascii=False) + "\n"
+                                      for record in chunk))
+            with self._lock:
+                self.results.extend(chunk)
+
+        metadata = {**self.dataset_metadata, "summary": aggregate_results(self.results, seed=0),
+                    "usage": {"wall_clock_s": round(time.time() - self.started_at, 3),
+                              **summarize_usage(self.results)}}
+        if self.status == "cancelled":
+            metadata["cancelled"] = {"n_cases_run": self.n_done, "n_cases_total": self.n_cases}
+        save_dataset(path_to_fname=self.output_file, dataset={"metadata": metadata, "test_cases": self.results})
+        # The results file holds every record of the journal
+        self.journal_path.unlink(missing_ok=True)
+        if self.status == "running":
+            self.status = "done"
+
+
+class JobManager:
+    """
+    Table of the evaluation jobs of the UI, executed one at a time by a background thread.
+
+    Jobs run outside of the Streamlit script thread: the page is not blocked during a run,
+    and a run survives reruns and navigation to other pages. Submitted jobs are queued and
+    run in order; they can be cancelled while queued or running.
+    """
+
+    def __init__(self):
+        """Initialize an empty job table and start the runner thread."""
+        self.jobs: Dict[str, EvaluationJob] = {}
+        self._queue: "queue.Queue[EvaluationJob]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run_jobs, name="evaluation-jobs", daemon=True)
+        self._thread.start()
+
+    def submit(self, job: EvaluationJob) -> str:
+        """Queue a job, and return its identifier."""
+        with self._lock:
+            self.jobs[job.job_id] = job
+        self._queue.put(job)
+        logger.info(f"Queued job {job.job_id}: task {job.task_name}, {job.n_cases} cases")
+        return job.job_id
+
+    def cancel(self, job_id: str) -> None:
+        """Cancel a queued or running job."""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def list_jobs(self) -> List[EvaluationJob]:
+        """Jobs of the table, most recent first."""
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def clear_finished(self) -> None:
+        """Remove the finished jobs from the table."""
+        with self._lock:
+            self.jobs = {job_id: job for job_id, job in self.jobs.items() if job.status not in FINISHED_STATUSES}
+
+    def _run_jobs(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job.cancel_event.is_set():
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                continue
+            try:
+                job.run()
+                logger.info(f"Job {job.job_id} {job.status}: {job.n_done}/{job.n_cases} cases")
+            except Exception as e:
+                logger.error(f"Job {job.job_id} failed: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+
+
+_MANAGER: Optional[JobManager] = None
+_MANAGER_LOCK = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager, shared by the sessions of the UI."""
+    global _MANAGER
+    with _MANAGER_LOCK:
+        if _MANAGER is None:
+            _MANAGER = JobManager()
+        return _MANAGER
@@ -3,14 +3,10 @@ import yaml
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 import glob
-import inspect
-import importlib.util
-from models import create_model
-from evaluator import Evaluator
 from main import load_task_executor
 
 from lib.utils import load_config_files, get_available_tasks
-from lib.automatic_evaluation_page import run_single_evaluation
+from lib.task_registry import get_task_registry
 
 
 CANDIDATE_CONFIG_FILE = "candidate_model.yaml"
@@ -18,46 +14,6 @@ EVALUATOR_CONFIG_FILE = "evaluator.yaml"
 TASKS_CONFIG_FILE = "tasks.yaml"
 
 
-def get_executor_class(task_file: str):
-    """get the name of the main class in a task file."""
-    task_class = None
-    print(task_file)
-    module = importlib.import_module(task_file)
-    try:
-        # Import the module dynamically
-        spec = importlib.util.spec_from_file_location(
-            task_file.stem, 
-            str(task_file)
-        )
-        if spec is None or spec.loader is None:
-            return "Could not load task file"
-            
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        
-        # Get all classes from the module
-        classes = inspect.getmembers(module, inspect.isclass)
-        # Find the task class (assuming it's the only one or ends with 'Task')
-
-        for name, cls in classes:
-            if name.endswith('Task'):
-                task_class = getattr(module, name)
-        if not task_class:
-            print(f"No class Executor ending with <BASENAME>Task coudl be foudn in {task_file}")
-        
-        return  task_class
-    except Exception as e:
-        return f"Error findign task class: {str(e)}"
-
-
-def get_class_docstring(task_class_obj) -> str:
-    """Extract docstring from the main class in a task file."""
-    try:       
-        return inspect.getdoc(task_class_obj) or "No documentation available"
-    except Exception as e:
-        return f"Error loading task documentation: {str(e)}"
-
-
 def get_dataset_info(dataset_path: str) -> dict:
     """Get information about the dataset."""
     try:
@@ -93,58 +49,72 @@ def get_datasets_for_task(task_type: str) -> List[str]:
             continue
     
     return datasets
-    
-# def run_single_evaluation(
-#     task_executor: Any,
-#     model_config: dict,
-#     evaluator_config: dict,
-#     task_name: str,
-#     test_case: List[dict],
-#     output_dir: Optional[Path] = None
-# ) -> List[Dict[str, Any]]:
-#     """Run evaluation for a single test case or a list of test cases."""
-#     try:
-#         # Create model
-#         try:
-#             model = create_model(
-#                 model_name=model_config["model"]["name"],
-#                 model_type=model_config["model"]["type"],
-#                 **model_config.get("parameters", {})
-#             )
-#         except Exception as e:
-#             st.error(f"Failed to create model: {str(e)}")
-#             return []
 
-#         # Create evaluator
-#         try:
-#             eval_model = create_model(
-#                 model_name=evaluator_config["model"]["name"],
-#                 model_type=evaluator_config["model"]["type"],
-#                 api_key_source=evaluator_config["model"]["api_key_source"],
-#                 **evaluator_config.get("parameters", {})
-#             )
-#             evaluator = Evaluator(eval_model, evaluator_config["evaluator_prompt"])
-#         except Exception as e:
-#             st.error(f"Failed to create evaluator: {str(e)}")
-#             return []
 
-#         # Create task runner
-#         task_runner = task_executor(model)
+def run_single_evaluation(
+    task_executor: Any,
+    model_config: dict,
+    evaluator_config: dict,
+    task_name: str,
+    test_cases: List[dict],
+    output_file: str,
+    stream: bool = False
+) -> List[Dict[str, Any]]:
+    """Run evaluation for a single test case or a list of test cases."""
+    # Model SDKs are only imported when an evaluation is run, not on page load
+    from models import get_model
+    from evaluator import Evaluator, judge_options
+    from lib.metrics import apply_pricing
+    from lib.ollama_utils import reset_ollama_probes
 
-#         # Run task
-#         results = task_runner.run_task(test_case)
+                    # Create output directory
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    # Give an Ollama server marked unhealthy during a previous run another chance
+    reset_ollama_probes()
 
-#         # Run evaluation
-#         evaluated_results = evaluator.evaluate_results(
-#             results,
-#             output_path=None if not isinstance(output_dir, str) else Path(output_dir)/f"{task_name}_results.json"
-#         )
+    try:
+        # Create model (shared client, reused across reruns)
+        try:
+            model = get_model(
+                model_name=model_config["model"]["name"],
+                model_type=model_config["model"]["type"],
+                **model_config.get("parameters", {})
+            )
+        except Exception as e:
+            st.error(f"Failed to create model: {str(e)}")
+            return []
 
-#         return evaluated_results
+        # Create evaluator
+        try:
+            eval_model = get_model(
+                model_name=evaluator_config["model"]["name"],
+                model_type=evaluator_config["model"]["type"],
+                api_key_source=evaluator_config["model"]["api_key_source"],
+                **evaluator_config.get("parameters", {})
+            )
+            evaluator = Evaluator(eval_model, evaluator_config["evaluator_prompt"], **judge_options(evaluator_config))
+        except Exception as e:
+            st.error(f"Failed to create evaluator: {str(e)}")
+            return []
+        # Create task runner
+        task_runner = task_executor(model, stream=stream)
 
-#     except Exception as e:
-#         st.error(f"Evaluation failed: {str(e)}")
-#         return []
+        # Run task
+        results = task_runner.run_task(test_cases)
+
+        # Run evaluation
+        evaluated_results = evaluator.evaluate_results(
+            results,
+            output_path=output_file
+        )
+        apply_pricing(evaluated_results, "candidate", model_config.get("pricing"))
+        apply_pricing(evaluated_results, "judge", evaluator_config.get("pricing"))
+
+        return evaluated_results
+
+    except Exception as e:
+        st.error(f"Evaluation failed: {str(e)}")
+        return []
 
 
 def manual_evaluation_page():
@@ -198,10 +168,9 @@ def manual_evaluation_page():
     )
 
     if selected_task:
-        # Load TaskExecutor: SummarizationTask, etc...
-        TaskExecutor = load_task_executor(module_path=tasks_config[selected_task]["import_lib"], 
-                                            class_name=tasks_config[selected_task]["executor"])
-        doc = get_class_docstring(TaskExecutor)
+        # Docstring of the TaskExecutor (SummarizationTask, etc...), read without importing it
+        doc = get_task_registry().get_docstring(tasks_config[selected_task]["import_lib"],
+                                                tasks_config[selected_task]["executor"])
         with st.expander("Task Description", expanded=True):
             st.markdown(doc)
         
@@ -263,7 +232,8 @@ def manual_evaluation_page():
                         # Run evaluation
                         try:
                             results = run_single_evaluation(
-                                task_executor=TaskExecutor,
+                                task_executor=load_task_executor(module_path=tasks_config[selected_task]["import_lib"],
+                                                                 class_name=tasks_config[selected_task]["executor"]),
                                 model_config=model_config,
                                 evaluator_config=evaluator_config,
                                 task_name=selected_task,
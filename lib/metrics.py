@@ -0,0 +1,285 @@
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+logger = logging.getLogger(__name__)
+
+
+USAGE_ROLES = ("candidate", "judge")
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+class UsageCallback(BaseCallbackHandler):
+    """
+    Collects token usage and timings of the model calls made during one invocation.
+
+    Token counts are read from the metadata returned by the backend: `usage_metadata`
+    of chat messages, `token_usage` of OpenAI models, `prompt_eval_count`/`eval_count`
+    of Ollama models. Time-to-first-token is only available for streamed calls.
+    """
+
+    def __init__(self):
+        """Initialize empty counters."""
+        self.start_time: Optional[float] = None
+        self.first_token_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.has_token_counts = False
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], **kwargs: Any) -> None:
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.end_time = time.perf_counter()
+        prompt_tokens, completion_tokens, cached_tokens = extract_token_usage(response)
+        if prompt_tokens is not None or completion_tokens is not None:
+            self.has_token_counts = True
+            self.prompt_tokens += prompt_tokens or 0
+            self.completion_tokens += completion_tokens or 0
+            self.cached_tokens += cached_tokens or 0
+
+    def usage(self, wall_clock: float) -> Dict[str, Any]:
+        """Return the usage record of the invocation, given its measured wall-clock time."""
+        usage = {"latency_s": round(wall_clock, 4)}
+        if self.start_time is not None and self.first_token_time is not None:
+            usage["ttft_s"] = round(self.first_token_time - self.start_time, 4)
+        if self.has_token_counts:
+            usage["prompt_tokens"] = self.prompt_tokens
+            usage["completion_tokens"] = self.completion_tokens
+            usage["cached_tokens"] = self.cached_tokens
+        return usage
+
+
+def extract_token_usage(response: LLMResult) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """Extract (prompt_tokens, completion_tokens, cached_tokens) from a LangChain LLM result."""
+    for generations in response.generations:
+        for generation in generations:
+            # Chat models: standardized usage metadata on the message
+            usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage_metadata:
+                details = usage_metadata.get("input_token_details") or {}
+                return (usage_metadata.get("input_tokens"),
+                        usage_metadata.get("output_tokens"),
+                        details.get("cache_read"))
+
+            # Ollama completion models: counters in the generation info
+            info = generation.generation_info or {}
+            if "prompt_eval_count" in info or "eval_count" in info:
+                return info.get("prompt_eval_count"), info.get("eval_count"), None
+
+    # OpenAI models: aggregated token usage in the llm output
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        details = token_usage.get("prompt_tokens_details") or {}
+        return (token_usage.get("prompt_tokens"),
+                token_usage.get("completion_tokens"),
+                details.get("cached_tokens"))
+
+    return None, None, None
+
+
+def invoke_with_usage(
+    runnable: Any,
+    inputs: Any,
+    stream: bool = False,
+    cancel: Optional[threading.Event] = None
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Invoke a model or chain and record the usage of the call.
+
+    Args:
+        runnable: LangChain model or chain
+        inputs: Inputs of the invocation
+        stream: If True, stream the response (see `stream_with_usage`)
+        cancel: Optional event that stops reading a streamed response once set
+
+    Returns:
+        Tuple of the response and the usage record (latency, token counts where available)
+
+    Raises:
+        OllamaUnavailableError: If the model is served by an Ollama server marked unhealthy
+    """
+    from lib.ollama_utils import guard_ollama_call
+
+    if stream:
+        # Calls to an Ollama server marked unhealthy fail fast (circuit breaker of lib.ollama_utils)
+        return guard_ollama_call(runnable, lambda: stream_with_usage(runnable, inputs, cancel=cancel))
+
+    callback = UsageCallback()
+    start = time.perf_counter()
+    response = guard_ollama_call(runnable, lambda: runnable.invoke(inputs, config={"callbacks": [callback]}))
+    return response, callback.usage(wall_clock=time.perf_counter() - start)
+
+
+def stream_with_usage(
+    runnable: Any,
+    inputs: Any,
+    cancel: Optional[threading.Event] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Stream the response of a model or chain, and record its throughput metrics.
+
+    Besides the usage of `invoke_with_usage`, the usage record holds the time-to-first-token,
+    the mean inter-token latency (between streamed chunks) and the output tokens per second
+    (completion tokens, or chunks if the backend does not report token counts, divided by the
+    generation time after the first token).
+
+    Args:
+        runnable: LangChain model or chain
+        inputs: Inputs of the invocation
+        cancel: Optional event that stops reading the response once set (the response is
+            then incomplete and its usage flagged with `cancelled`)
+
+    Returns:
+        Tuple of the full response text and the usage record
+    """
+    callback = UsageCallback()
+    parts = []
+    chunk_times = []
+    start = time.perf_counter()
+    cancelled = False
+    for chunk in runnable.stream(inputs, config={"callbacks": [callback]}):
+        if cancel is not None and cancel.is_set():
+            cancelled = True
+            break
+        text = chunk.content if hasattr(chunk, "content") else chunk
+        if text:
+            chunk_times.append(time.perf_counter())
+            parts.append(text)
+    end = time.perf_counter()
+
+    usage = callback.usage(wall_clock=end - start)
+    usage["streamed"] = True
+    if cancelled:
+        usage["cancelled"] = True
+    if chunk_times:
+        usage["ttft_s"] = round(chunk_times[0] - start, 4)
+        if len(chunk_times) > 1:
+            gaps = np.diff(chunk_times)
+            usage["inter_token_latency_s"] = round(float(gaps.mean()), 5)
+            generation_time = chunk_times[-1] - chunk_times[0]
+            n_tokens = usage.get("completion_tokens") or len(chunk_times)
+            if generation_time > 0:
+                usage["output_tokens_per_s"] = round((n_tokens - 1) / generation_time, 2)
+
+    return "".join(parts), usage
+
+
+def call_cost(usage: Dict[str, Any], pricing: Optional[Dict[str, Any]]) -> Optional[float]:
+    """
+    Cost of a model call in USD.
+
+    Args:
+        usage: Usage record of the call
+        pricing: Prices per million tokens: `input_per_1m_tokens`, `output_per_1m_tokens`
+            and optionally `cached_input_per_1m_tokens`
+
+    Returns:
+        The cost, or None if no pricing or token counts are available
+    """
+    if not pricing or "prompt_tokens" not in usage:
+        return None
+
+    input_price = float(pricing.get("input_per_1m_tokens", 0.0))
+    cached_price = float(pricing.get("cached_input_per_1m_tokens", input_price))
+    output_price = float(pricing.get("output_per_1m_tokens", 0.0))
+    cached = usage.get("cached_tokens", 0) or 0
+    cost = ((usage["prompt_tokens"] - cached) * input_price
+            + cached * cached_price
+            + usage.get("completion_tokens", 0) * output_price) / 1e6
+    return round(cost, 6)
+
+
+def apply_pricing(records: List[Dict[str, Any]], role: str, pricing: Optional[Dict[str, Any]]) -> None:
+    """Add the cost of the calls made in `role` ("candidate" or "judge") to the usage of each record."""
+    if not pricing:
+        return
+    for record in records:
+        usage = (record.get("usage") or {}).get(role)
+        if usage:
+            cost = call_cost(usage, pricing)
+            if cost is not None:
+                usage["cost_usd"] = cost
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    """Mean, percentiles and max of a list of timings."""
+    array = np.asarray(values, dtype=float)
+    stats = {"mean": round(float(array.mean()), 4)}
+    for p, value in zip(LATENCY_PERCENTILES, np.percentile(array, LATENCY_PERCENTILES)):
+        stats[f"p{p}"] = round(float(value), 4)
+    stats["max"] = round(float(array.max()), 4)
+    return stats
+
+
+def summarize_usage(records: List[Dict[str, Any]], roles: Tuple[str, ...] = USAGE_ROLES) -> Dict[str, Any]:
+    """
+    Roll up the per-case usage of a task: totals of tokens and cost, and latency percentiles.
+
+    Args:
+        records: List of task records with a `usage` entry
+        roles: Roles of the model calls to summarize
+
+    Returns:
+        Dict of usage summaries per role
+    """
+    summary = {}
+    for role in roles:
+        usages = [(r.get("usage") or {}).get(role) for r in records]
+        usages = [u for u in usages if u]
+        if not usages:
+            continue
+
+        measured = [u for u in usages if "latency_s" in u]
+        role_summary = {
+            "calls": len(measured),
+            "cached_responses": sum(1 for u in usages if u.get("cached")),
+            "prompt_tokens": sum(u.get("prompt_tokens", 0) for u in measured),
+            "completion_tokens": sum(u.get("completion_tokens", 0) for u in measured),
+            "cached_tokens": sum(u.get("cached_tokens", 0) for u in measured),
+        }
+        hedged = [u for u in measured if u.get("hedged")]
+        if hedged:
+            # Duplicate calls issued for stragglers, and how often the duplicate answered first
+            role_summary["hedged_calls"] = len(hedged)
+            role_summary["hedge_wins"] = sum(1 for u in hedged if u.get("hedge_won"))
+            role_summary["hedge_rate"] = round(len(hedged) / len(measured), 4)
+        if role_summary["prompt_tokens"] and role_summary["cached_tokens"]:
+            # Share of the prompt tokens served from the prompt cache of the backend
+            role_summary["cache_hit_rate"] = round(role_summary["cached_tokens"] / role_summary["prompt_tokens"], 4)
+        costs = [u["cost_usd"] for u in measured if "cost_usd" in u]
+        if costs:
+            role_summary["cost_usd"] = round(sum(costs), 6)
+        if measured:
+            role_summary["latency_s"] = _percentiles([u["latency_s"] for u in measured])
+        # Streaming metrics: time-to-first-token, inter-token latency and output throughput
+        for metric in ("ttft_s", "inter_token_latency_s", "output_tokens_per_s"):
+            values = [u[metric] for u in measured if metric in u]
+            if values:
+                role_summary[metric] = _percentiles(values)
+        streamed = [u for u in measured if u.get("streamed") and "completion_tokens" in u]
+        if streamed:
+            # Aggregate throughput of the task, for capacity planning
+            role_summary["total_output_tokens_per_s"] = round(
+                sum(u["completion_tokens"] for u in streamed) / max(sum(u["latency_s"] for u in streamed), 1e-9), 2
+            )
+        summary[role] = role_summary
+
+    return summary
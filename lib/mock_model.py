@@ -0,0 +1,169 @@
+import math
+import time
+import random
+import hashlib
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, GenerationChunk, LLMResult
+
+
+MOCK_MODES = ("echo", "canned", "random")
+LATENCY_DISTRIBUTIONS = ("constant", "normal", "lognormal", "exponential")
+
+_WORDS = (
+    "product quality customer order delivery price feature design battery screen support "
+    "return warranty size color material comfort performance value shipping review"
+).split()
+
+# Number of calls per (model, seed, prompt), so that retries of the same prompt draw new latencies/failures
+_CALL_COUNTS: Dict[str, int] = {}
+_CALL_COUNTS_LOCK = threading.Lock()
+
+
+class MockRateLimitError(RuntimeError):
+    """Simulated rate limit error (HTTP 429)."""
+
+    status_code = 429
+
+
+class MockModelError(RuntimeError):
+    """Simulated backend failure (HTTP 500)."""
+
+    status_code = 500
+
+
+class MockLLM(LLM):
+    """
+    Deterministic mock language model, to benchmark and test the pipeline without network access.
+
+    Responses only depend on the seed and the prompt:
+      - `echo`: returns the prompt
+      - `canned`: returns one of `responses`, picked from the hash of the prompt
+      - `random`: returns seeded random words, with "Score: X" and "Verdict: V" lines if `judge` is set
+
+    Every call sleeps for a latency drawn from `latency_distribution` (mean `latency_mean`,
+    spread `latency_std`), and fails with probability `failure_rate` (MockModelError) or
+    `rate_limit_rate` (MockRateLimitError). Streamed responses are paced at `tokens_per_s`.
+    """
+
+    model: str = "mock"
+    mode: str = "echo"
+    responses: List[str] = []
+    judge: bool = False
+    response_words: int = 50
+    seed: int = 0
+    latency_mean: float = 0.0
+    latency_std: float = 0.0
+    latency_distribution: str = "constant"
+    failure_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    tokens_per_s: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "mock"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "mode": self.mode, "seed": self.seed}
+
+    def _prompt_rng(self, prompt: str, salt: str = "") -> random.Random:
+        """Random generator seeded from the seed, the prompt and a salt."""
+        digest = hashlib.sha256(f"{self.seed}:{salt}:{prompt}".encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _call_rng(self, prompt: str) -> random.Random:
+        """Random generator of the n-th call with this prompt (deterministic sequence of calls)."""
+        key = hashlib.sha256(f"{self.model}:{self.seed}:{prompt}".encode("utf-8")).hexdigest()
+        with _CALL_COUNTS_LOCK:
+            attempt = _CALL_COUNTS.get(key, 0)
+            _CALL_COUNTS[key] = attempt + 1
+        return self._prompt_rng(prompt, salt=f"call-{attempt}")
+
+    def _latency(self, rng: random.Random) -> float:
+        """Draw the latency of a call."""
+        if self.latency_mean <= 0:
+            return 0.0
+        if self.latency_distribution == "normal":
+            return max(0.0, rng.gauss(self.latency_mean, self.latency_std))
+        if self.latency_distribution == "lognormal":
+            # latency_std is the sigma of the underlying normal distribution
+            mu = math.log(self.latency_mean) - self.latency_std ** 2 / 2
+            return rng.lognormvariate(mu, self.latency_std)
+        if self.latency_distribution == "exponential":
+            return rng.expovariate(1.0 / self.latency_mean)
+        return self.latency_mean
+
+    def _simulate_call(self, prompt: str) -> None:
+        """Sleep for the simulated latency, and raise the simulated errors."""
+        rng = self._call_rng(prompt)
+        latency = self._latency(rng)
+        draw = rng.random()
+        if latency:
+            time.sleep(latency)
+        if draw < self.rate_limit_rate:
+            raise MockRateLimitError("429 Too Many Requests (simulated)")
+        if draw < self.rate_limit_rate + self.failure_rate:
+            raise MockModelError("500 Internal Server Error (simulated)")
+
+    def _response(self, prompt: str) -> str:
+        """Deterministic response to a prompt."""
+        if self.mode == "echo":
+            return prompt
+        rng = self._prompt_rng(prompt)
+        if self.mode == "canned":
+            if not self.responses:
+                raise ValueError("MockLLM in canned mode requires a list of responses")
+            return self.responses[rng.randrange(len(self.responses))]
+        if self.mode == "random":
+            text = " ".join(rng.choice(_WORDS) for _ in range(self.response_words))
+            if self.judge:
+                verdict = rng.choice(["1", "2", "tie"])
+                text = f"Evaluation:\n  - Score: {rng.randint(0, 5)}\n  - Verdict: {verdict}\n  - Explanation: {text}"
+            return text
+        raise ValueError(f"Unsupported mock mode: {self.mode}. Must be one of {MOCK_MODES}")
+
+    def _generation_info(self, prompt: str, text: str) -> Dict[str, Any]:
+        """Token counts in the format of Ollama (whitespace-separated words)."""
+        return {"prompt_eval_count": len(prompt.split()), "eval_count": len(text.split())}
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        self._simulate_call(prompt)
+        return self._response(prompt)
+
+    def _generate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> LLMResult:
+        generations = []
+        for prompt in prompts:
+            text = self._call(prompt, stop=stop, run_manager=run_manager, **kwargs)
+            generations.append([Generation(text=text, generation_info=self._generation_info(prompt, text))])
+        return LLMResult(generations=generations)
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> Iterator[GenerationChunk]:
+        self._simulate_call(prompt)
+        text = self._response(prompt)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if self.tokens_per_s and i > 0:
+                time.sleep(1.0 / self.tokens_per_s)
+            last = i == len(words) - 1
+            chunk = GenerationChunk(
+                text=word if last else f"{word} ",
+                generation_info=self._generation_info(prompt, text) if last else None
+            )
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
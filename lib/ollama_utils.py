@@ -0,0 +1,232 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+CONNECT_TIMEOUT = 2.0  # seconds
+READ_TIMEOUT = 5.0  # seconds
+MODEL_LIST_TTL = 30.0  # seconds
+FAILURE_THRESHOLD = 2  # consecutive failures before the host is marked unhealthy
+LOAD_TIMEOUT = 600.0  # seconds, loading a large model in memory can take minutes
+
+
+class OllamaUnavailableError(RuntimeError):
+    """Raised when the Ollama server cannot be reached or was marked unhealthy."""
+
+
+def get_ollama_base_url(base_url: Optional[str] = None) -> str:
+    """
+    Return the base URL of the Ollama server.
+
+    Uses `base_url` if given, else the OLLAMA_HOST environment variable, else http://localhost:11434.
+    """
+    url = base_url or os.getenv("OLLAMA_HOST") or DEFAULT_OLLAMA_URL
+    if not url.startswith(("http://", "https://")):
+        url = f"http://{url}"
+    return url.rstrip("/")
+
+
+class OllamaProbe:
+    """
+    Availability probe of an Ollama server.
+
+    Requests go through a pooled `requests.Session` with strict connect/read timeouts,
+    and the list of local models is cached for `ttl` seconds. After `failure_threshold`
+    consecutive failures the host is marked unhealthy and every further probe fails fast
+    (circuit breaker), until `reset` is called, e.g. at the start of the next run. Model calls
+    to the server share the breaker (see `guard_ollama_call`): their connection errors and
+    timeouts count as failures, and once the host is unhealthy they fail fast too.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_OLLAMA_URL,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        ttl: float = MODEL_LIST_TTL,
+        failure_threshold: int = FAILURE_THRESHOLD
+    ):
+        """Initialize the probe and its HTTP session."""
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.ttl = ttl
+        self.failure_threshold = failure_threshold
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+        self._lock = threading.Lock()
+        self._models: Optional[List[str]] = None
+        self._fetched_at = 0.0
+        self._failures = 0
+
+    @property
+    def healthy(self) -> bool:
+        """False once the host was marked unhealthy."""
+        return self._failures < self.failure_threshold
+
+    def reset(self) -> None:
+        """Clear the cached model list and close the circuit breaker."""
+        with self._lock:
+            self._models = None
+            self._fetched_at = 0.0
+            self._failures = 0
+
+    def check(self) -> None:
+        """
+        Fail fast if the host was marked unhealthy.
+
+        Raises:
+            OllamaUnavailableError: If the host is marked unhealthy
+        """
+        if not self.healthy:
+            raise OllamaUnavailableError(f"Ollama server {self.base_url} marked unhealthy")
+
+    def record_call(self, error: Optional[Exception] = None) -> None:
+        """Update the circuit breaker with the outcome of a model call (connection errors and timeouts are failures)."""
+        failed = error is not None and (isinstance(error, (ConnectionError, TimeoutError)) or any(
+            word in type(error).__name__ for word in ("Timeout", "Connect")))
+        with self._lock:
+            if not failed:
+                if error is None:
+                    self._failures = 0
+                return
+            self._failures += 1
+            if self._failures == self.failure_threshold:
+                logger.error(f"Ollama server {self.base_url} marked unhealthy: {error}")
+
+    def list_models(self) -> List[str]:
+        """
+        Return the names of the models available on the server.
+
+        Raises:
+            OllamaUnavailableError: If the server cannot be reached or is marked unhealthy
+        """
+        with self._lock:
+            self.check()
+
+            if self._models is not None and time.monotonic() - self._fetched_at < self.ttl:
+                return self._models
+
+            try:
+                response = self.session.get(f"{self.base_url}/api/tags", timeout=self.timeout)
+                response.raise_for_status()
+                self._models = [m["name"] for m in response.json().get("models", [])]
+                self._fetched_at = time.monotonic()
+                self._failures = 0
+                return self._models
+            except Exception as e:
+                self._failures += 1
+                if not self.healthy:
+                    logger.error(f"Ollama server {self.base_url} marked unhealthy: {e}")
+                raise OllamaUnavailableError(f"Ollama server {self.base_url} not reachable: {e}")
+
+    def preload(self, model_name: str, keep_alive: Optional[str | int] = None) -> Dict[str, Any]:
+        """
+        Load a model in memory without generating, and pin it for `keep_alive`.
+
+        Args:
+            model_name: Name of the model to load
+            keep_alive: How long the model stays loaded (e.g. "30m", or -1 to keep it until unloaded)
+
+        Returns:
+            Dict with the wall-clock time of the request and the load duration reported by the server
+
+        Raises:
+            OllamaUnavailableError: If the server is marked unhealthy or the model cannot be loaded
+        """
+        self.check()
+
+        # A generate request without prompt only loads the model
+        payload: Dict[str, Any] = {"model": model_name, "stream": False}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+
+        start = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                         timeout=(self.timeout[0], LOAD_TIMEOUT))
+            response.raise_for_status()
+        except Exception as e:
+            raise OllamaUnavailableError(f"Failed to preload {model_name} on {self.base_url}: {e}")
+
+        info = {"preload_s": round(time.perf_counter() - start, 3)}
+        load_duration = response.json().get("load_duration")
+        if load_duration is not None:
+            info["load_duration_s"] = round(load_duration / 1e9, 3)
+        return info
+
+    def is_model_available(self, model_name: str) -> bool:
+        """Check if a model is available on the server (a name without tag matches ':latest')."""
+        try:
+            models = self.list_models()
+        except OllamaUnavailableError as e:
+            logger.warning(str(e))
+            return False
+        return model_name in models or f"{model_name}:latest" in models
+
+
+_PROBES: Dict[str, OllamaProbe] = {}
+_PROBES_LOCK = threading.Lock()
+
+
+def get_ollama_probe(base_url: Optional[str] = None) -> OllamaProbe:
+    """Return the shared probe of an Ollama server."""
+    url = get_ollama_base_url(base_url)
+    with _PROBES_LOCK:
+        if url not in _PROBES:
+            _PROBES[url] = OllamaProbe(url)
+        return _PROBES[url]
+
+
+def ollama_probe_of(runnable: Any) -> Optional[OllamaProbe]:
+    """Shared probe of the Ollama server called by a model or a `prompt | model` chain, or None for other backends."""
+    model = getattr(runnable, "last", runnable)
+    if not type(model).__module__.startswith("langchain_ollama"):
+        return None
+    return get_ollama_probe(getattr(model, "base_url", None))
+
+
+def guard_ollama_call(runnable: Any, call: Any) -> Any:
+    """
+    Make a model call through the circuit breaker of its Ollama server.
+
+    Args:
+        runnable: LangChain model or chain
+        call: Function without arguments making the call
+
+    Returns:
+        The result of `call`
+
+    Raises:
+        OllamaUnavailableError: If the server was marked unhealthy (the call is not made)
+    """
+    probe = ollama_probe_of(runnable)
+    if probe is None:
+        return call()
+    probe.check()
+    try:
+        result = call()
+    except Exception as e:
+        probe.record_call(e)
+        raise
+    probe.record_call()
+    return result
+
+
+def reset_ollama_probes() -> None:
+    """Reset the cache and circuit breaker of all the probes (call at the start of a run)."""
+    with _PROBES_LOCK:
+        probes = list(_PROBES.values())
+    for probe in probes:
+        probe.reset()
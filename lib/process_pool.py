@@ -0,0 +1,154 @@
+import json
+import math
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+# State of a worker process, set once by `init_worker`
+_WORKER: Dict[str, Any] = {}
+# Shards per worker process: smaller shards balance the load, larger ones amortize the transfers
+SHARDS_PER_JOB = 4
+
+
+def init_worker(
+    model_config: Dict[str, Any],
+    evaluator_config: Dict[str, Any],
+    tasks_config: Dict[str, Any],
+    stream: bool = False,
+    cache_path: Optional[str] = None,
+    verbose: bool = False
+) -> None:
+    """
+    Initialize a worker process: create and warm up its candidate model, and create its judge and response cache once.
+
+    The task executors are created on the first shard of each task and reused.
+    """
+    from main import create_candidate_model, create_judge_model, setup_logging, warmup_model
+    from evaluator import Evaluator, judge_options
+    from lib.cache import ResponseCache, model_signature
+
+    setup_logging(verbose)
+    cache = ResponseCache(cache_path) if cache_path else None
+    judge = Evaluator(create_judge_model(evaluator_config), evaluator_config["evaluator_prompt"],
+                      cache=cache, model_key=model_signature(evaluator_config),
+                      **judge_options(evaluator_config))
+    model = create_candidate_model(model_config)
+    # Warm-up timings are logged by the worker, they are not part of the case latencies
+    warmup_model(model, model_config)
+    _WORKER.update({
+        "model": model,
+        "model_key": model_signature(model_config),
+        "evaluator": judge,
+        "tasks_config": tasks_config,
+        "stream": stream,
+        "cache": cache,
+        "runners": {}
+    })
+
+
+def run_shard(task_name: str, cases: List[Dict[str, Any]], evaluate: bool) -> List[Dict[str, Any]]:
+    """
+    Run a shard of the test cases of a task in a worker process.
+
+    Args:
+        task_name: Name of the task (entry of tasks.yaml)
+        cases: Test cases of the shard
+        evaluate: If True, the records are also scored by the judge
+
+    Returns:
+        Records of the cases, in the order of `cases`
+    """
+    from main import create_task_runner, load_task_executor
+    from lib.cache import run_task_cached
+
+    runners = _WORKER["runners"]
+    if task_name not in runners:
+        task_config = _WORKER["tasks_config"][task_name]
+        ExecutorClass = load_task_executor(module_path=task_config["import_lib"], class_name=task_config["executor"])
+        runners[task_name] = create_task_runner(ExecutorClass, _WORKER["model"], task_config, stream=_WORKER["stream"])
+
+    results = run_task_cached(runners[task_name], cases, _WORKER["cache"], _WORKER["model_key"])
+    if evaluate:
+        results = _WORKER["evaluator"].evaluate_results(results, output_path=None)
+    return results
+
+
+def plain(config: Any) -> Any:
+    """Copy of a configuration as plain dicts and lists, to be sent to the worker processes."""
+    return json.loads(json.dumps(config, default=str))
+
+
+class ProcessPool:
+    """
+    Pool of worker processes running the cases of the tasks, to use several cores for the
+    Python-side work of each case (chain construction, serialization, score parsing, metrics).
+
+    Workers are started once per run with the `spawn` method, and initialized once with their
+    model clients (see `init_worker`). The parent process does not create the models.
+    """
+
+    def __init__(
+        self,
+        jobs: int,
+        model_config: Dict[str, Any],
+        evaluator_config: Dict[str, Any],
+        tasks_config: Dict[str, Any],
+        stream: bool = False,
+        cache_path: Optional[str] = None,
+        verbose: bool = False
+    ):
+        """Start `jobs` worker processes."""
+        self.jobs = max(1, int(jobs))
+        self.tasks_config = tasks_config
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(plain(model_config), plain(evaluator_config), plain(tasks_config), stream, cache_path, verbose)
+        )
+
+    def task_runner(self, task_name: str, task_config: Dict[str, Any]) -> "ProcessPoolTaskRunner":
+        """Task runner of a task, running its cases in the pool."""
+        return ProcessPoolTaskRunner(self, task_name, evaluate=bool(task_config.get("run_evaluation")))
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        self.executor.shutdown()
+
+
+class ProcessPoolTaskRunner:
+    """
+    Task runner splitting the test cases of a task in shards run by the worker processes.
+
+    It has the interface of a task executor (`run_task`). Shards are streamed back in order as
+    they complete, so the records are returned in the order of the cases. If the task is
+    evaluated, the shards are also judged in the workers (`judges_results`).
+    """
+
+    def __init__(self, pool: ProcessPool, task_name: str, evaluate: bool = False):
+        """Initialize the runner of a task."""
+        self.pool = pool
+        self.task_name = task_name
+        self.judges_results = evaluate
+        self.cache = None
+        self.executor_name = pool.tasks_config.get(task_name, {}).get("executor")
+        self.max_workers = pool.jobs
+
+    def run_task(self, dataset_path_or_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run the test cases in the worker processes, and return their records in order."""
+        cases = list(dataset_path_or_cases)
+        shard_size = max(1, math.ceil(len(cases) / (self.pool.jobs * SHARDS_PER_JOB)))
+        shards = [cases[i:i + shard_size] for i in range(0, len(cases), shard_size)]
+
+        results = []
+        # map yields the shards in order, as soon as each one and its predecessors are done
+        for n, shard_results in enumerate(self.pool.executor.map(
+                run_shard, [self.task_name] * len(shards), shards, [self.judges_results] * len(shards)), start=1):
+            results.extend(shard_results)
+            logger.debug(f"Task {self.task_name}: shard {n}/{len(shards)} done")
+        return results
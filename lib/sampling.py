@@ -0,0 +1,165 @@
+import random
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+STRATA_FIELDS = ("difficulty_level", "sub_category")
+
+
+def stratum_key(case: Dict[str, Any], fields: Sequence[str] = STRATA_FIELDS) -> Tuple[str, ...]:
+    """Return the stratum of a test case: the values of `fields` (lists such as sub_category are joined)."""
+    key = []
+    for field in fields:
+        value = case.get(field, "")
+        if isinstance(value, (list, tuple)):
+            value = "|".join(str(v) for v in value)
+        key.append(str(value if value is not None else ""))
+    return tuple(key)
+
+
+def group_by_stratum(
+    cases: List[Dict[str, Any]],
+    fields: Sequence[str] = STRATA_FIELDS
+) -> Dict[Tuple[str, ...], List[Dict[str, Any]]]:
+    """Group test cases by stratum, preserving the order of the cases within each stratum."""
+    strata: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for case in cases:
+        strata.setdefault(stratum_key(case, fields), []).append(case)
+    return strata
+
+
+def stratified_order(
+    cases: List[Dict[str, Any]],
+    seed: Optional[int] = None,
+    fields: Sequence[str] = STRATA_FIELDS
+) -> List[Dict[str, Any]]:
+    """
+    Return the test cases in a random order where every prefix is (approximately) stratified.
+
+    Cases are shuffled within their stratum, then interleaved: the i-th case of a stratum of
+    size n is placed at position (i + u) / n, u being a random offset drawn per stratum. Any
+    prefix of the returned list therefore holds each stratum in proportion to its size.
+    """
+    rng = random.Random(seed)
+    keyed = []
+    for key, members in sorted(group_by_stratum(cases, fields).items()):
+        members = list(members)
+        rng.shuffle(members)
+        offset = rng.random()
+        n = len(members)
+        keyed.extend(((i + offset) / n, rng.random(), case) for i, case in enumerate(members))
+
+    keyed.sort(key=lambda item: (item[0], item[1]))
+    return [case for _, _, case in keyed]
+
+
+def stratified_batches(
+    cases: List[Dict[str, Any]],
+    batch_size: int,
+    seed: Optional[int] = None,
+    fields: Sequence[str] = STRATA_FIELDS
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield stratified random batches of test cases until the dataset is exhausted.
+
+    Args:
+        cases: List of test cases
+        batch_size: Number of cases per batch
+        seed: Seed of the random generator, for reproducible batches
+        fields: Case fields defining the strata
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be a positive integer, got {batch_size}")
+
+    ordered = stratified_order(cases, seed=seed, fields=fields)
+    for start in range(0, len(ordered), batch_size):
+        yield ordered[start:start + batch_size]
+
+
+def stratified_sample(
+    cases: List[Dict[str, Any]],
+    size: Optional[float] = None,
+    per_stratum: Optional[int] = None,
+    seed: Optional[int] = 0,
+    fields: Sequence[str] = STRATA_FIELDS
+) -> List[Dict[str, Any]]:
+    """
+    Pick a reproducible stratified random subset of test cases.
+
+    Cases are drawn in the order of `stratified_order`, so that the subset holds each stratum
+    in proportion to its size, skipping the cases of a stratum once it reached `per_stratum`.
+
+    Args:
+        cases: List of test cases
+        size: Number of cases of the subset, or fraction of the dataset if below 1 (all cases if None)
+        per_stratum: Maximum number of cases per stratum (no limit if None)
+        seed: Seed of the random generator, the same seed picks the same subset
+        fields: Case fields defining the strata
+
+    Returns:
+        The selected test cases, in the order of the dataset
+    """
+    if size is not None and size <= 0:
+        raise ValueError(f"size must be positive, got {size}")
+    if per_stratum is not None and per_stratum < 1:
+        raise ValueError(f"per_stratum must be a positive integer, got {per_stratum}")
+
+    if size is None:
+        n_cases = len(cases)
+    elif size < 1:
+        n_cases = max(1, round(size * len(cases)))
+    else:
+        n_cases = int(size)
+
+    selected = set()
+    counts: Dict[Tuple[str, ...], int] = {}
+    for case in stratified_order(cases, seed=seed, fields=fields):
+        if len(selected) >= n_cases:
+            break
+        key = stratum_key(case, fields)
+        if per_stratum is not None and counts.get(key, 0) >= per_stratum:
+            continue
+        counts[key] = counts.get(key, 0) + 1
+        selected.add(id(case))
+    return [case for case in cases if id(case) in selected]
+
+
+def sampling_label(size: Optional[float] = None, per_stratum: Optional[int] = None, seed: Optional[int] = 0) -> str:
+    """Short label of a sampling spec, used to name the results of sampled runs (e.g. sample-n50-k5-seed0)."""
+    parts = ["sample"]
+    if size is not None:
+        parts.append(f"n{size:g}")
+    if per_stratum is not None:
+        parts.append(f"k{per_stratum}")
+    parts.append(f"seed{seed}")
+    return "-".join(parts)
+
+
+def sample_dataset(
+    dataset: Dict[str, Any],
+    size: Optional[float] = None,
+    per_stratum: Optional[int] = None,
+    seed: Optional[int] = 0,
+    fields: Sequence[str] = STRATA_FIELDS
+) -> Dict[str, Any]:
+    """
+    Return a copy of a dataset restricted to a stratified subset of its test cases (see `stratified_sample`).
+
+    The metadata of the copy holds the sampling spec under `sampling`, so that results of sampled
+    runs are not confused with full runs.
+    """
+    if size is not None and size >= 1:
+        size = int(size)
+    cases = dataset["test_cases"]
+    subset = stratified_sample(cases, size=size, per_stratum=per_stratum, seed=seed, fields=fields)
+    metadata = dict(dataset.get("metadata") or {})
+    metadata["sampling"] = {
+        "label": sampling_label(size, per_stratum, seed),
+        "size": size,
+        "per_stratum": per_stratum,
+        "seed": seed,
+        "strata": list(fields),
+        "n_cases": len(subset),
+        "n_cases_total": len(cases),
+        "n_strata": len(group_by_stratum(subset, fields))
+    }
+    return {**dataset, "metadata": metadata, "test_cases": subset}
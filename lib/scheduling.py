@@ -0,0 +1,188 @@
+import os
+import heapq
+import statistics
+from typing import Any, Callable, Dict, List, Optional
+
+
+SCHEDULES = ("fifo", "prefix", "ljf")
+# Relative cost of a character of the response vs a character of the prompt: output tokens are
+# decoded one at a time while the prompt is processed in parallel
+OUTPUT_CHAR_WEIGHT = 20.0
+
+
+def prefix_key(case: Dict[str, Any]) -> str:
+    """Leading text of the prompt of a test case: the system prompt, then the instruction."""
+    return f"{case.get('system_prompt', '')}\n{case.get('instruction', '')}"
+
+
+def prefix_order(cases: List[Dict[str, Any]]) -> List[int]:
+    """
+    Order the cases so that prompts sharing a prefix are sent back to back.
+
+    Sorting the prompts lexicographically groups the cases by system prompt and, within
+    a group, puts the instructions with the longest common prefix next to each other.
+    Ties keep the dataset order.
+
+    Returns:
+        Indices of the cases, in scheduling order
+    """
+    return sorted(range(len(cases)), key=lambda i: prefix_key(cases[i]))
+
+
+def latency_history(results: List[Dict[str, Any]]) -> Dict[Any, float]:
+    """Measured latency of the candidate model call of each case of previous results, by case_id."""
+    history = {}
+    for result in results:
+        usage = (result.get("usage") or {}).get("candidate") or {}
+        if "latency_s" in usage and result.get("case_id") is not None:
+            history[result["case_id"]] = float(usage["latency_s"])
+    return history
+
+
+def case_size(case: Dict[str, Any]) -> float:
+    """Size of the work of a test case: characters of the prompt, plus weighted characters of the expected response."""
+    return len(prefix_key(case)) + OUTPUT_CHAR_WEIGHT * len(str(case.get("expected_response") or ""))
+
+
+def estimate_costs(
+    cases: List[Dict[str, Any]],
+    history: Optional[Dict[Any, float]] = None
+) -> List[float]:
+    """
+    Estimate the duration of the model call of each case.
+
+    Cases with a past latency in `history` get that latency. The other cases are estimated
+    from their size (see `case_size`), converted to seconds with the median latency per unit
+    of size of the cases with a history (sizes are returned as is without history).
+
+    Args:
+        cases: List of test cases
+        history: Past latency in seconds by case_id (see `latency_history`)
+
+    Returns:
+        Estimated cost of each case, in the order of `cases`
+    """
+    history = history or {}
+    sizes = [case_size(case) for case in cases]
+    known = [(history[case.get("case_id")], size) for case, size in zip(cases, sizes)
+             if case.get("case_id") in history and size > 0]
+    seconds_per_unit = statistics.median(latency / size for latency, size in known) if known else 1.0
+    return [history.get(case.get("case_id"), size * seconds_per_unit) for case, size in zip(cases, sizes)]
+
+
+def ljf_order(cases: List[Dict[str, Any]], history: Optional[Dict[Any, float]] = None) -> List[int]:
+    """
+    Longest job first: order the cases by decreasing estimated cost.
+
+    With concurrent workers, starting the longest calls first keeps them from being the last
+    ones running on a single worker while the others are idle. Ties keep the dataset order.
+
+    Returns:
+        Indices of the cases, in scheduling order
+    """
+    costs = estimate_costs(cases, history)
+    return sorted(range(len(cases)), key=lambda i: -costs[i])
+
+
+def schedule_order(
+    cases: List[Dict[str, Any]],
+    schedule: str = "fifo",
+    history: Optional[Dict[Any, float]] = None
+) -> List[int]:
+    """
+    Indices of the cases in the order they are sent to the model.
+
+    Args:
+        cases: List of test cases
+        schedule: "fifo" (dataset order), "prefix" (shared prompt prefixes back to back)
+            or "ljf" (longest estimated job first)
+        history: Past latency by case_id, used by the "ljf" schedule
+    """
+    if schedule == "fifo":
+        return list(range(len(cases)))
+    if schedule == "prefix":
+        return prefix_order(cases)
+    if schedule == "ljf":
+        return ljf_order(cases, history)
+    raise ValueError(f"Unsupported schedule: {schedule}. Must be one of {SCHEDULES}")
+
+
+def makespan(costs: List[float], workers: int = 1) -> float:
+    """Wall time of running jobs of the given costs in order on `workers` concurrent workers (each job goes to the first free worker)."""
+    finish_times = [0.0] * max(1, workers)
+    for cost in costs:
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + cost)
+    return max(finish_times)
+
+
+def makespan_stats(
+    cases: List[Dict[str, Any]],
+    order: List[int],
+    workers: int = 1,
+    history: Optional[Dict[Any, float]] = None
+) -> Dict[str, Any]:
+    """
+    Estimated wall time of a schedule compared with the FIFO schedule.
+
+    Both wall times are simulated (see `makespan`) from the estimated costs of the cases; they
+    are estimates, not measurements of the run.
+
+    Returns:
+        Dict with the number of workers, the estimated wall time of the schedule and of FIFO
+        (in seconds if a case has a past latency in `history`, in units of `case_size` otherwise), and the
+        relative reduction of the wall time versus FIFO
+    """
+    costs = estimate_costs(cases, history)
+    # Costs are converted to seconds only when the history holds some of the cases
+    timed = any(case.get("case_id") in (history or {}) for case in cases)
+    scheduled = makespan([costs[i] for i in order], workers)
+    fifo = makespan(costs, workers)
+    return {
+        "workers": workers,
+        "cost_unit": "s" if timed else "chars",
+        "estimated_wall_time": round(scheduled, 3),
+        "estimated_fifo_wall_time": round(fifo, 3),
+        "estimated_wall_time_reduction": round(1 - scheduled / fifo, 4) if fifo else 0.0
+    }
+
+
+def prefix_stats(cases: List[Dict[str, Any]], order: List[int]) -> Dict[str, Any]:
+    """
+    Prompt prefix reuse of a schedule.
+
+    Returns:
+        Dict with the number of distinct system prompts, the number of system prompt switches
+        between consecutive calls, and the characters each prompt shares with the previous one
+    """
+    keys = [prefix_key(cases[i]) for i in order]
+    system_prompts = [cases[i].get("system_prompt", "") for i in order]
+    shared_chars = sum(len(os.path.commonprefix([a, b])) for a, b in zip(keys, keys[1:]))
+    return {
+        "distinct_system_prompts": len(set(system_prompts)),
+        "system_prompt_switches": sum(1 for a, b in zip(system_prompts, system_prompts[1:]) if a != b),
+        "shared_prefix_chars": shared_chars,
+        "prompt_chars": sum(len(k) for k in keys)
+    }
+
+
+def run_scheduled(
+    run: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+    cases: List[Dict[str, Any]],
+    schedule: str = "fifo",
+    history: Optional[Dict[Any, float]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run the cases in scheduling order, and return the results in the order of `cases`.
+
+    Args:
+        run: Function running a list of cases and returning one result per case, in the same order
+        cases: List of test cases (in case_id order)
+        schedule: Scheduling policy (see `schedule_order`)
+        history: Past latency by case_id (see `estimate_costs`)
+    """
+    order = schedule_order(cases, schedule, history)
+    scheduled_results = run([cases[i] for i in order])
+    results: List[Dict[str, Any]] = [None] * len(cases)
+    for i, result in zip(order, scheduled_results):
+        results[i] = result
+    return results
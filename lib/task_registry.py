@@ -0,0 +1,216 @@
+import os
+import ast
+import sys
+import time
+import logging
+import importlib
+import importlib.util
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+TASKS_DIR = "tasks"
+ENTRY_POINT_GROUP = "llmevalforge.tasks"
+# Required fields of the executors built on tasks._base.TaskEngine that do not override them
+DEFAULT_REQUIRED_FIELDS = ["instruction", "system_prompt"]
+DISCOVERY_TTL_S = 10.0  # the manifest is reused for this long, unless the tasks directory changes
+
+
+def _literal(node: ast.AST) -> Any:
+    """Value of a literal AST node, or None if it is not a literal."""
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, SyntaxError, TypeError):
+        return None
+
+
+def parse_task_module(path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Describe the classes of a task module without importing it.
+
+    Args:
+        path: Path to the python file of the task
+
+    Returns:
+        Dict mapping each class name to its docstring and required fields
+    """
+    tree = ast.parse(path.read_text(), filename=str(path))
+    classes = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        required_fields = None
+        for statement in node.body:
+            if (isinstance(statement, ast.Assign)
+                    and any(isinstance(t, ast.Name) and t.id == "required_fields" for t in statement.targets)):
+                required_fields = _literal(statement.value)
+        classes[node.name] = {
+            "doc": ast.get_docstring(node) or "No documentation available",
+            "required_fields": required_fields if required_fields is not None else list(DEFAULT_REQUIRED_FIELDS)
+        }
+    return classes
+
+
+class TaskRegistry:
+    """
+    Registry of the task plugins: the modules of the tasks directory and the installed
+    packages declaring an entry point in the `llmevalforge.tasks` group.
+
+    Task modules are described from their source (classes, docstrings, required fields)
+    without being imported, and the description is kept until the modification time of
+    the file changes. The manifest itself is reused without listing the task files again
+    until the tasks directory changes (a task file added, removed or renamed) or `ttl`
+    seconds have passed (a task file edited in place). Entry points are resolved once.
+    Executor classes are imported once and cached; a class is reloaded when its file was
+    modified.
+    """
+
+    def __init__(self, tasks_dir: str | Path = TASKS_DIR, ttl: float = DISCOVERY_TTL_S):
+        """Initialize an empty registry of the tasks of `tasks_dir`."""
+        self.tasks_dir = Path(tasks_dir)
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+        self._discovered_at: Optional[float] = None
+        self._dir_mtime: Optional[float] = None
+        self._classes: Dict[Tuple[str, str], Tuple[Any, Optional[float]]] = {}
+        self._entry_points: Optional[Dict[str, Tuple[str, Optional[str], Optional[Path]]]] = None
+
+    def _tasks_dir_mtime(self) -> Optional[float]:
+        """Modification time of the tasks directory, or None if it does not exist."""
+        try:
+            return os.stat(self.tasks_dir).st_mtime
+        except OSError:
+            return None
+
+    def _task_files(self) -> Dict[str, Tuple[str, Path]]:
+        """Task name -> (module path, file) of the task modules and of the entry points."""
+        files = {}
+        if self.tasks_dir.exists():
+            package = ".".join(self.tasks_dir.parts)
+            for f in sorted(self.tasks_dir.glob("*.py")):
+                if f.name != "__init__.py" and not f.name.startswith("_"):
+                    files[f.stem] = (f"{package}.{f.stem}", f)
+
+        if self._entry_points is None:
+            self._entry_points = {}
+            from importlib.metadata import entry_points
+            for ep in entry_points(group=ENTRY_POINT_GROUP):
+                module, _, attr = ep.value.partition(":")
+                spec = importlib.util.find_spec(module)
+                self._entry_points[ep.name] = (module, attr or None,
+                                               Path(spec.origin) if spec and spec.origin else None)
+        for name, (module, _, path) in self._entry_points.items():
+            if path is not None:
+                files.setdefault(name, (module, path))
+        return files
+
+    def discover(self, refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the manifest of the available tasks, parsing only the new or modified task files.
+
+        Args:
+            refresh: List the task files even if the manifest is recent and the tasks directory
+                did not change
+
+        Returns:
+            Dict mapping each task name to its module, file, modification time, executor class
+            name (if found) and classes (docstring and required fields)
+        """
+        with self._lock:
+            dir_mtime = self._tasks_dir_mtime()
+            if (not refresh and self._discovered_at is not None and dir_mtime == self._dir_mtime
+                    and time.monotonic() - self._discovered_at < self.ttl):
+                return dict(self._manifest)
+
+            manifest = {}
+            for name, (module, path) in self._task_files().items():
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    continue
+                entry = self._manifest.get(name)
+                if entry is None or entry["mtime"] != mtime or entry["path"] != str(path):
+                    try:
+                        classes = parse_task_module(path)
+                    except SyntaxError as e:
+                        logger.error(f"Failed to parse task {name}: {e}")
+                        continue
+                    executor = (self._entry_points or {}).get(name, (None, None, None))[1]
+                    if executor is None:
+                        executor = next((c for c in classes if c.endswith("Task")), None)
+                    entry = {"name": name, "module": module, "path": str(path), "mtime": mtime,
+                             "executor": executor, "classes": classes}
+                manifest[name] = entry
+            self._manifest = manifest
+            self._dir_mtime = dir_mtime
+            self._discovered_at = time.monotonic()
+            return dict(manifest)
+
+    def available_tasks(self) -> List[str]:
+        """Names of the available tasks."""
+        return list(self.discover())
+
+    def _module_info(self, module_path: str) -> Optional[Dict[str, Any]]:
+        """Manifest entry of a module, if it is a registered task."""
+        return next((e for e in self.discover().values() if e["module"] == module_path), None)
+
+    def get_class(self, module_path: str, class_name: str) -> Any:
+        """
+        Return an executor class, importing its module on first use only.
+
+        Raises:
+            ImportError: If the module cannot be imported
+            AttributeError: If the class does not exist in the module
+        """
+        with self._lock:
+            info = self._module_info(module_path)
+            mtime = info["mtime"] if info else None
+            cached = self._classes.get((module_path, class_name))
+            if cached is not None and cached[1] == mtime:
+                return cached[0]
+
+            module = importlib.import_module(module_path)
+            if cached is not None and module_path in sys.modules:
+                # The task file was modified since the class was loaded
+                module = importlib.reload(module)
+            cls = getattr(module, class_name)
+            self._classes[(module_path, class_name)] = (cls, mtime)
+            return cls
+
+    def _class_info(self, module_path: str, class_name: str) -> Optional[Dict[str, Any]]:
+        """Description of a class of a registered task module."""
+        info = self._module_info(module_path)
+        return info["classes"].get(class_name) if info else None
+
+    def get_docstring(self, module_path: str, class_name: str) -> str:
+        """Docstring of an executor class, read from the source when possible."""
+        class_info = self._class_info(module_path, class_name)
+        if class_info is not None:
+            return class_info["doc"]
+        import inspect
+        return inspect.getdoc(self.get_class(module_path, class_name)) or "No documentation available"
+
+    def get_required_fields(self, module_path: str, class_name: str) -> List[str]:
+        """Fields required in the test cases of an executor class."""
+        class_info = self._class_info(module_path, class_name)
+        if class_info is not None:
+            return list(class_info["required_fields"])
+        return list(getattr(self.get_class(module_path, class_name), "required_fields", DEFAULT_REQUIRED_FIELDS))
+
+
+_REGISTRY: Optional[TaskRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_task_registry() -> TaskRegistry:
+    """Return the process-wide registry of the task plugins."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = TaskRegistry()
+        return _REGISTRY
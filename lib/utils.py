@@ -1,6 +1,5 @@
 import os
 import re
-from glob import glob
 import ruamel.yaml
 from pathlib import Path
 from typing import Dict, Any, List
@@ -94,18 +93,11 @@ def save_dataset(path_to_fname: str, dataset: Dict):
 
 
 def get_available_tasks() -> List[str]:
-    """Scan tasks folder and return available task names."""
-    tasks_dir = Path("tasks")
-    if not tasks_dir.exists():
-        return []
-    
-    # Get all Python files in the tasks directory, excluding __init__.py and common files
-    task_files = [
-        f.stem for f in tasks_dir.glob("*.py") 
-        if f.name != "__init__.py" and not f.name.startswith("_")
-    ]
-    
-    return task_files
+    """Return the names of the available tasks (task modules and installed task plugins)."""
+    from lib.task_registry import get_task_registry
+
+    # The registry only parses the task files that changed since the last call
+    return get_task_registry().available_tasks()
 
 
 def load_dataset(fname):
@@ -0,0 +1,260 @@
+import json
+import time
+import uuid
+import socket
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_QUEUE_PATH = ".cache/work_queue.sqlite"
+DEFAULT_LEASE_S = 120.0  # a work item is re-delivered if its worker does not renew the lease in time
+DEFAULT_MAX_DELIVERIES = 3
+POLL_INTERVAL_S = 1.0
+
+
+def default_worker_id() -> str:
+    """Identifier of a worker process: host name and a random suffix."""
+    return f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+
+
+class WorkQueue:
+    """
+    Durable queue of (task, case) work items, stored in a SQLite file.
+
+    The file can live on storage shared by several hosts: the coordinator pushes batches of
+    test cases with the spec of their task executor and candidate model, and workers lease
+    items, run them and post their results. A leased item is re-delivered to another worker
+    if its lease expires (dead or stuck worker); after `max_deliveries` deliveries it is
+    completed with an error result, so that a poisoned case does not block the run.
+
+    Each process opens its own connection; writes are serialized by SQLite file locks.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_QUEUE_PATH, max_deliveries: int = DEFAULT_MAX_DELIVERIES):
+        """Open (or create) the queue file."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_deliveries = max_deliveries
+        self._lock = threading.Lock()
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS batches ("
+                "batch_id TEXT PRIMARY KEY, task TEXT NOT NULL, spec TEXT NOT NULL, created REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS items ("
+                "batch_id TEXT NOT NULL, position INTEGER NOT NULL, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL DEFAULT 'pending', worker TEXT, lease_until REAL, "
+                "deliveries INTEGER NOT NULL DEFAULT 0, result TEXT, "
+                "PRIMARY KEY (batch_id, position));"
+                "CREATE INDEX IF NOT EXISTS items_status ON items (status, lease_until);"
+            )
+
+    def _transaction(self, statements: Any) -> Any:
+        """Run `statements(cursor)` in a write transaction, and return its result."""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(cursor)
+                cursor.execute("COMMIT")
+                return result
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def push(self, task: str, spec: Dict[str, Any], cases: List[Dict[str, Any]]) -> str:
+        """
+        Push a batch of test cases of a task.
+
+        Args:
+            task: Name of the task
+            spec: JSON-serializable spec of the executor and model that run the cases
+            cases: Test cases, in the order of the batch
+
+        Returns:
+            Identifier of the batch
+        """
+        batch_id = uuid.uuid4().hex
+
+        def insert(cursor: sqlite3.Cursor) -> None:
+            cursor.execute("INSERT INTO batches (batch_id, task, spec, created) VALUES (?, ?, ?, ?)",
+                           (batch_id, task, json.dumps(spec, default=str), time.time()))
+            cursor.executemany("INSERT INTO items (batch_id, position, payload) VALUES (?, ?, ?)",
+                               [(batch_id, i, json.dumps(case, default=str, ensure_ascii=False))
+                                for i, case in enumerate(cases)])
+
+        self._transaction(insert)
+        return batch_id
+
+    def lease(self, worker: str, limit: int = 1, lease_s: float = DEFAULT_LEASE_S) -> Optional[Dict[str, Any]]:
+        """
+        Lease up to `limit` pending (or expired) items of a single batch.
+
+        Returns:
+            Dict with the batch_id, task, spec and the leased `items` (position and case),
+            or None if no item is available
+        """
+        def take(cursor: sqlite3.Cursor) -> Optional[Dict[str, Any]]:
+            now = time.time()
+            available = ("(status = 'pending' OR (status = 'leased' AND lease_until < ?))")
+            row = cursor.execute(f"SELECT batch_id FROM items WHERE {available} ORDER BY rowid LIMIT 1",
+                                 (now,)).fetchone()
+            if row is None:
+                return None
+            batch_id = row[0]
+            rows = cursor.execute(
+                f"SELECT position, payload, deliveries, worker FROM items WHERE batch_id = ? AND {available} "
+                "ORDER BY position LIMIT ?", (batch_id, now, limit)
+            ).fetchall()
+
+            items = []
+            for position, payload, deliveries, previous_worker in rows:
+                if deliveries >= self.max_deliveries:
+                    # Delivered too many times: give up on the case
+                    error = f"ERROR: case abandoned after {deliveries} deliveries (last worker: {previous_worker})"
+                    result = {**json.loads(payload), "model_response": error, "score": None, "feedback": None}
+                    cursor.execute("UPDATE items SET status = 'done', result = ? WHERE batch_id = ? AND position = ?",
+                                   (json.dumps(result, default=str), batch_id, position))
+                    continue
+                if deliveries:
+                    logger.warning(f"Re-delivering case {position} of batch {batch_id} (lease of {previous_worker} expired)")
+                cursor.execute(
+                    "UPDATE items SET status = 'leased', worker = ?, lease_until = ?, deliveries = deliveries + 1 "
+                    "WHERE batch_id = ? AND position = ?", (worker, now + lease_s, batch_id, position)
+                )
+                items.append({"position": position, "case": json.loads(payload)})
+            if not items:
+                return take(cursor)
+
+            task, spec = cursor.execute("SELECT task, spec FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+            return {"batch_id": batch_id, "task": task, "spec": json.loads(spec), "items": items}
+
+        return self._transaction(take)
+
+    def renew(self, worker: str, batch_id: str, positions: List[int], lease_s: float = DEFAULT_LEASE_S) -> int:
+        """Extend the leases of items still held by a worker. Returns the number of renewed leases."""
+        def update(cursor: sqlite3.Cursor) -> int:
+            cursor.executemany(
+                "UPDATE items SET lease_until = ? WHERE batch_id = ? AND position = ? AND worker = ? AND status = 'leased'",
+                [(time.time() + lease_s, batch_id, p, worker) for p in positions]
+            )
+            return cursor.rowcount
+
+        return self._transaction(update)
+
+    def complete(self, worker: str, batch_id: str, position: int, result: Dict[str, Any]) -> bool:
+        """
+        Post the result of a leased item.
+
+        Returns:
+            False if the item was re-delivered to another worker in the meantime (the result is dropped)
+        """
+        def update(cursor: sqlite3.Cursor) -> bool:
+            cursor.execute(
+                "UPDATE items SET status = 'done', result = ? "
+                "WHERE batch_id = ? AND position = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result, default=str, ensure_ascii=False), batch_id, position, worker)
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(update)
+
+    def progress(self, batch_id: str) -> Dict[str, int]:
+        """Number of items of a batch per status (pending, leased, done)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM items WHERE batch_id = ? GROUP BY status",
+                                      (batch_id,)).fetchall()
+        return {"pending": 0, "leased": 0, "done": 0, **dict(rows)}
+
+    def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Results of the completed items of a batch, in the order of the batch."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM items WHERE batch_id = ? AND status = 'done' ORDER BY position", (batch_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete(self, batch_id: str) -> None:
+        """Remove a batch and its items."""
+        def remove(cursor: sqlite3.Cursor) -> None:
+            cursor.execute("DELETE FROM items WHERE batch_id = ?", (batch_id,))
+            cursor.execute("DELETE FROM batches WHERE batch_id = ?", (batch_id,))
+
+        self._transaction(remove)
+
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class QueueTaskRunner:
+    """
+    Task runner of the coordinator: runs the test cases on remote workers through a WorkQueue.
+
+    It has the interface of a task executor (`run_task`), so the rest of the pipeline (scheduling,
+    response cache, evaluation, outputs) is unchanged. Cases are pushed in the given order and
+    the results are returned in that order once every case is done.
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        task_name: str,
+        spec: Dict[str, Any],
+        poll_interval: float = POLL_INTERVAL_S,
+        log_interval: float = 30.0
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            queue: Work queue shared with the workers
+            task_name: Name of the task
+            spec: Spec of the task executor and candidate model (see `task_spec`)
+            poll_interval: Delay between two checks of the progress, in seconds
+            log_interval: Delay between two progress logs, in seconds
+        """
+        self.queue = queue
+        self.task_name = task_name
+        self.spec = spec
+        self.poll_interval = poll_interval
+        self.log_interval = log_interval
+        self.cache = None
+        self.executor_name = spec.get("task_config", {}).get("executor")
+        self.max_workers = int((spec.get("task_config", {}).get("executor_options") or {}).get("max_workers", 1))
+
+    def run_task(self, dataset_path_or_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Push the test cases to the queue and wait for their results."""
+        cases = list(dataset_path_or_cases)
+        batch_id = self.queue.push(self.task_name, self.spec, cases)
+        logger.info(f"Queued {len(cases)} cases of task {self.task_name} (batch {batch_id})")
+
+        last_log = time.monotonic()
+        while True:
+            progress = self.queue.progress(batch_id)
+            if progress["done"] >= len(cases):
+                break
+            if time.monotonic() - last_log >= self.log_interval:
+                logger.info(f"Task {self.task_name}: {progress['done']}/{len(cases)} cases done, "
+                            f"{progress['leased']} running, {progress['pending']} pending")
+                last_log = time.monotonic()
+            time.sleep(self.poll_interval)
+
+        results = self.queue.results(batch_id)
+        self.queue.delete(batch_id)
+        return results
+
+
+def task_spec(task_config: Dict[str, Any], model_config: Dict[str, Any], stream: bool = False) -> Dict[str, Any]:
+    """JSON-serializable spec of a task executor and its candidate model, sent to the workers."""
+    # Round trip through JSON to turn the YAML mappings into plain dicts
+    return json.loads(json.dumps({"task_config": task_config, "model_config": model_config, "stream": stream},
+                                 default=str))
@@ -1,13 +1,25 @@
+import re
+import sys
+import copy
+import time
+import itertools
 import argparse
 import logging
+import threading
 from pathlib import Path
 
-from lib.utils import load_config_files
-from models import create_model
-import importlib
-from typing import Any
-from evaluator import Evaluator
-from lib.utils import load_dataset, save_dataset
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from lib.cache import DEFAULT_CACHE_PATH, ResponseCache, model_signature, run_task_cached
+from lib.sampling import sample_dataset, stratified_batches
+from lib.scheduling import SCHEDULES, latency_history, makespan_stats, prefix_stats, run_scheduled, schedule_order
+from lib.work_queue import DEFAULT_LEASE_S, DEFAULT_QUEUE_PATH
+
+# The model SDKs (LangChain), numpy and ruamel.yaml are imported where they are used,
+# so that the CLI starts fast (`--help`, argument errors) and only loads what a run needs.
+# See check_import_time.py.
+if TYPE_CHECKING:
+    from evaluator import Evaluator
 
 
 logger = logging.getLogger(__name__)
@@ -36,21 +48,395 @@ def load_task_executor(module_path: str, class_name: str) -> Any:
         ImportError: If module cannot be imported
         AttributeError: If class doesn't exist in module
     """
+    from lib.task_registry import get_task_registry
+
     try:
-        # Import the module
-        module = importlib.import_module(module_path)
-        
-        # Get the class from the module
-        return getattr(module, class_name)
-        
+        # Import the module once, the class is cached by the task registry
+        return get_task_registry().get_class(module_path, class_name)
+
     except ImportError as e:
         raise ImportError(f"Could not import module {module_path}: {e}")
     except AttributeError as e:
         raise AttributeError(f"Class {class_name} not found in module {module_path}: {e}")
-    
 
-def run_evaluation(config_dir: Path, output_dir: Path, verbose: bool = False):
-    """Run the evaluation pipeline."""
+
+def create_task_runner(
+    ExecutorClass: Any,
+    model: Any,
+    task_config: Dict[str, Any],
+    stream: bool = False,
+    call_limit: Optional[threading.Semaphore] = None
+) -> Any:
+    """
+    Create the executor of a task for a candidate model.
+
+    The optional `executor_options` of the task configuration (e.g. `max_workers`, `max_retries`
+    of the executors built on tasks._base.TaskEngine) are passed to the executor, as well as
+    `call_limit`, a semaphore capping the model calls in flight, if set.
+    """
+    options = dict(task_config.get("executor_options") or {})
+    if call_limit is not None:
+        options["call_limit"] = call_limit
+    return ExecutorClass(model, stream=stream, **options)
+
+
+def create_candidate_model(model_config: Dict[str, Any]) -> Any:
+    """
+    Create the candidate model from its configuration (content of candidate_model.yaml).
+
+    For Ollama models, the `keep_alive` of the `warmup` section is passed to the model,
+    so that it stays loaded for the duration of the run.
+    """
+    from models import get_model
+
+    parameters = dict(model_config["parameters"])
+    warmup_config = model_config.get("warmup") or {}
+    if model_config["model"]["type"] == "ollama" and warmup_config.get("keep_alive") is not None:
+        parameters.setdefault("keep_alive", warmup_config["keep_alive"])
+
+    return get_model(
+        model_name=model_config["model"]["name"],
+        model_type=model_config["model"]["type"],
+        **parameters
+    )
+
+
+def warmup_model(model: Any, model_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Warm up the candidate model before a run, so that load time is not measured as case latency.
+
+    Ollama models are preloaded in memory and pinned with `keep_alive`. If `dummy_generation`
+    is enabled, a short generation is also run (for any model type).
+
+    Args:
+        model: Candidate model instance
+        model_config: Candidate model configuration, with an optional `warmup` section
+
+    Returns:
+        Warm-up timings, reported separately from the case latencies
+    """
+    from lib.ollama_utils import get_ollama_probe
+
+    warmup_config = model_config.get("warmup") or {}
+    if not warmup_config.get("enabled", False):
+        return {}
+
+    info: Dict[str, Any] = {}
+    start = time.perf_counter()
+    try:
+        if model_config["model"]["type"] == "ollama":
+            probe = get_ollama_probe(model_config["parameters"].get("base_url"))
+            info.update(probe.preload(model_config["model"]["name"], keep_alive=warmup_config.get("keep_alive")))
+
+        if warmup_config.get("dummy_generation", False):
+            dummy_start = time.perf_counter()
+            model.invoke(warmup_config.get("dummy_prompt", "Hello"))
+            info["dummy_generation_s"] = round(time.perf_counter() - dummy_start, 3)
+    except Exception as e:
+        logger.warning(f"Warm-up of {model_config['model']['name']} failed: {e}")
+        info["error"] = str(e)
+
+    info["warmup_s"] = round(time.perf_counter() - start, 3)
+    logger.info(f"Warm-up of {model_config['model']['name']}: {info}")
+    return info
+
+
+def create_judge_model(evaluator_config: Dict[str, Any]) -> Any:
+    """Create the evaluator model from its configuration (content of evaluator.yaml)."""
+    from models import get_model
+
+    return get_model(
+        model_name=evaluator_config["model"]["name"],
+        model_type=evaluator_config["model"]["type"],
+        api_key_source=evaluator_config["model"]["api_key_source"],
+        **evaluator_config["parameters"]
+    )
+
+
+def create_batch_model(
+    role: str,
+    model_config: Dict[str, Any],
+    batch_export: Optional[str],
+    batch_responses: Dict[str, Dict[str, Any]]
+) -> Optional[Any]:
+    """
+    Create the stand-in model of a role ("candidate" or "judge") in offline batch mode.
+
+    Args:
+        role: Role of the model
+        model_config: Configuration of the model of this role
+        batch_export: Role whose requests are written to a batch file (phase 1), if any
+        batch_responses: Ingested batch responses, keyed by custom_id (phase 2)
+
+    Returns:
+        A recorder if the requests of the role are exported, a replay model if responses of
+        the role were ingested, or None if the role uses the live model
+    """
+    from lib.batch import BatchRecorder, BatchReplayModel
+
+    kwargs = {"role": role, "model": model_config["model"]["name"],
+              "parameters": dict(model_config.get("parameters") or {})}
+    if batch_export == role:
+        return BatchRecorder(**kwargs)
+    role_responses = {k: v for k, v in batch_responses.items() if k.startswith(f"{role}-")}
+    if role_responses:
+        logger.info(f"Replaying {len(role_responses)} batch responses of the {role} model")
+        return BatchReplayModel(responses=role_responses, **kwargs)
+    return None
+
+
+def judge_results(evaluator: "Evaluator", task_runner: Any, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Score task records with the evaluator, unless the task runner already judged them (process pool mode)."""
+    if getattr(task_runner, "judges_results", False):
+        return results
+    return evaluator.evaluate_results(results, output_path=None)
+
+
+def run_adaptive_task(
+    task_runner: Any,
+    evaluator: "Evaluator",
+    test_cases: List[dict],
+    target_ci_width: float,
+    batch_size: int = 10,
+    min_cases: int = 20,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+    cache: Optional[ResponseCache] = None,
+    model_key: str = "",
+    schedule: str = "fifo",
+    history: Optional[Dict[Any, float]] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Run and evaluate a task on stratified random batches of test cases, and stop as soon
+    as the bootstrap confidence interval of the mean score is narrower than `target_ci_width`.
+
+    Args:
+        task_runner: Task executor instance
+        evaluator: Evaluator used to score the model responses
+        test_cases: List of test cases of the task
+        target_ci_width: Stop once the width of the confidence interval drops below this value
+        batch_size: Number of cases generated and judged per batch
+        min_cases: Minimum number of cases to run before the stopping rule applies
+        confidence: Confidence level of the interval
+        seed: Seed of the batch sampler and of the bootstrap
+        cache: Optional cache of the candidate model responses
+        model_key: Signature of the candidate model, used as cache key
+        schedule: Order of the cases of a batch sent to the model (see lib.scheduling)
+        history: Past latency of the cases by case_id, used by the "ljf" schedule
+
+    Returns:
+        Tuple of the evaluated records (sorted by case_id) and the sampling summary
+    """
+    from lib.aggregation import bootstrap_ci, get_scores
+
+    results = []
+    ci = bootstrap_ci([], confidence=confidence)
+    converged = False
+    for batch in stratified_batches(test_cases, batch_size=batch_size, seed=seed):
+        batch_results = run_scheduled(lambda cases: run_task_cached(task_runner, cases, cache, model_key),
+                                      batch, schedule, history)
+        results.extend(judge_results(evaluator, task_runner, batch_results))
+
+        ci = bootstrap_ci(get_scores(results), confidence=confidence, seed=seed)
+        width = ci["ci_high"] - ci["ci_low"] if ci["n"] else float("inf")
+        logger.info(f"Adaptive sampling: {len(results)}/{len(test_cases)} cases, "
+                    f"mean={ci['mean']}, CI width={width:.3f}")
+        if len(results) >= min_cases and width <= target_ci_width:
+            converged = True
+            break
+
+    results.sort(key=lambda r: r.get("case_id", 0))
+    summary = {
+        "target_ci_width": target_ci_width,
+        "batch_size": batch_size,
+        "min_cases": min_cases,
+        "seed": seed,
+        "n_cases_run": len(results),
+        "n_cases_total": len(test_cases),
+        "converged": converged,
+        "ci_width": round(ci["ci_high"] - ci["ci_low"], 4) if ci["n"] else None
+    }
+    return results, summary
+
+
+def results_fname(task_name: str, metadata: Dict[str, Any]) -> str:
+    """File name of the results of a task, labeled with the sampling spec for sampled runs."""
+    if "sampling" in metadata:
+        return f"{task_name}_{metadata['sampling']['label']}_results.yaml"
+    return f"{task_name}_results.yaml"
+
+
+def evaluate_task(
+    task_name: str,
+    task_config: Dict[str, Any],
+    task_runner: Any,
+    dataset: Dict[str, Any],
+    model_config: Dict[str, Any],
+    evaluator: "Evaluator",
+    evaluator_config: Dict[str, Any],
+    cache: Optional[ResponseCache] = None,
+    adaptive_options: Optional[Dict[str, Any]] = None,
+    schedule: str = "fifo",
+    dedup_threshold: Optional[float] = None,
+    history: Optional[Dict[Any, float]] = None,
+    seed: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Run a task with the candidate model, evaluate the responses if required, and summarize the run.
+
+    Args:
+        task_name: Name of the task
+        task_config: Task configuration (entry of tasks.yaml)
+        task_runner: Task executor instance, built with the candidate model
+        dataset: Dataset of the task (`metadata` and `test_cases`)
+        model_config: Candidate model configuration
+        evaluator: Evaluator used to score the model responses
+        evaluator_config: Evaluator configuration
+        cache: Optional cache of the candidate model responses
+        adaptive_options: If set, keyword arguments of `run_adaptive_task` (adaptive sampling mode)
+        schedule: Order of the cases sent to the model: "fifo" (dataset order), "prefix"
+            (cases sharing a prompt prefix back to back, to reuse the KV/prompt cache of the backend)
+            or "ljf" (longest estimated cases first, to shorten the tail of concurrent runs)
+        dedup_threshold: If set, only one case per cluster of near-duplicates (Jaccard similarity of
+            system prompt, instruction and expected response above the threshold) is run, and its
+            results are copied to the other members of the cluster (see lib.dedup)
+        history: Past latency of the cases by case_id (see lib.scheduling.latency_history), used
+            to estimate the cost of the cases with the "ljf" schedule
+        seed: Seed of the bootstrap confidence intervals of the summary (0 if None), so that a
+            rerun on the same results reports the same intervals
+
+    Returns:
+        Tuple of the task records and the results metadata (dataset metadata, summary and usage)
+    """
+    from lib.aggregation import aggregate_results
+    from lib.metrics import apply_pricing, summarize_usage
+
+    task_start = time.perf_counter()
+    model_key = model_signature(model_config)
+    metadata = copy.deepcopy(dataset["metadata"])
+    test_cases = dataset["test_cases"]
+    duplicates = {}
+    if dedup_threshold is not None:
+        from lib.dedup import split_duplicates
+        test_cases, duplicates = split_duplicates(test_cases, dedup_threshold)
+        metadata["dedup"] = {"threshold": dedup_threshold, "n_cases_run": len(test_cases),
+                             "n_duplicates_skipped": len(duplicates)}
+        logger.info(f"Task {task_name}: skipping {len(duplicates)} near-duplicate cases")
+
+    if adaptive_options and task_config["run_evaluation"]:
+        # Generate and judge stratified batches until the score converges
+        results, metadata["adaptive_sampling"] = run_adaptive_task(
+            task_runner,
+            evaluator,
+            test_cases,
+            cache=cache,
+            model_key=model_key,
+            schedule=schedule,
+            history=history,
+            **adaptive_options
+        )
+    else:
+        if adaptive_options:
+            logger.warning(f"Adaptive mode requires run_evaluation for task {task_name}: running all cases")
+
+        # Run task, results are returned in dataset order whatever the schedule
+        candidate_start = time.perf_counter()
+        results = run_scheduled(lambda cases: run_task_cached(task_runner, cases, cache, model_key),
+                                test_cases, schedule, history)
+        candidate_wall_time = round(time.perf_counter() - candidate_start, 3)
+        order = schedule_order(test_cases, schedule, history)
+        metadata["scheduling"] = {"schedule": schedule, **prefix_stats(test_cases, order),
+                                  "measured_wall_time_s": candidate_wall_time}
+        if schedule == "ljf":
+            # Simulated makespans of the estimated case costs, with the concurrency of the executor;
+            # only the wall time of the schedule that ran is measured
+            stats = makespan_stats(test_cases, order, getattr(task_runner, "max_workers", 1), history)
+            metadata["scheduling"].update(stats)
+            logger.info(f"Task {task_name}: longest-job-first schedule, estimated (simulated from the case cost "
+                        f"estimates, in {stats['cost_unit']}) wall time reduction vs FIFO: "
+                        f"{stats['estimated_wall_time_reduction']:.1%}; measured candidate wall time "
+                        f"{candidate_wall_time}s")
+
+        # Run evaluation if required
+        if task_config["run_evaluation"]:
+            results = judge_results(evaluator, task_runner, results)
+
+    if duplicates:
+        from lib.dedup import copy_duplicate_results
+        results = copy_duplicate_results(dataset["test_cases"], results, duplicates)
+
+    logger.info(f"Completed task: {task_name}")
+
+    if task_config["run_evaluation"]:
+        # Mean scores with bootstrap confidence intervals, per task and per difficulty_level
+        metadata["summary"] = aggregate_results(results, seed=seed if seed is not None else 0)
+
+    # Tokens, cost and latency percentiles of the candidate and judge calls
+    apply_pricing(results, "candidate", model_config.get("pricing"))
+    apply_pricing(results, "judge", evaluator_config.get("pricing"))
+    metadata["usage"] = {
+        "wall_clock_s": round(time.perf_counter() - task_start, 3),
+        **summarize_usage(results)
+    }
+    return results, metadata
+
+
+def run_evaluation(
+    config_dir: Path,
+    output_dir: Path,
+    verbose: bool = False,
+    adaptive: bool = False,
+    target_ci_width: float = 0.5,
+    adaptive_batch_size: int = 10,
+    adaptive_min_cases: int = 20,
+    seed: Optional[int] = None,
+    cache_path: Optional[str] = None,
+    stream: bool = False,
+    batch_export: Optional[str] = None,
+    batch_responses: Optional[List[str]] = None,
+    schedule: str = "fifo",
+    dedup_threshold: Optional[float] = None,
+    sample_size: Optional[float] = None,
+    sample_per_stratum: Optional[int] = None,
+    queue_path: Optional[str] = None,
+    jobs: int = 1
+):
+    """
+    Run the evaluation pipeline.
+
+    In adaptive mode, tasks with `run_evaluation` enabled are run on stratified random batches
+    of test cases until the confidence interval of the mean score is narrower than `target_ci_width`.
+    If `cache_path` is set, the responses of the candidate model are cached and reused across runs.
+    If `stream` is set, the candidate responses are streamed to measure time-to-first-token and tokens/sec.
+    `schedule` sets the order of the cases sent to the candidate model (see lib.scheduling).
+    If `dedup_threshold` is set, near-duplicate test cases are run once and share their results (see lib.dedup).
+    If `sample_size` or `sample_per_stratum` is set, each task is run on a stratified random subset of its
+    test cases (see lib.sampling.sample_dataset), drawn with `seed` (0 if None) so that it is reproducible;
+    the results are saved in `<task>_<sample label>_results.yaml` and hold the sampling spec in their metadata.
+
+    Offline batch mode runs in two phases. With `batch_export` ("candidate" or "judge"), the requests
+    of that role are written to `<output_dir>/batch/<role>_requests.jsonl` in the OpenAI batch format,
+    and no results are saved. With `batch_responses` (batch output files), the candidate and/or judge
+    calls are answered from the ingested responses instead of live calls.
+
+    Distributed mode: with `queue_path` (a SQLite file on storage shared with the workers), this process
+    is the coordinator. The candidate calls of each task are pushed to the work queue and run by
+    `main.py worker` processes (see `run_worker`); the judge calls, aggregation and outputs are unchanged.
+
+    With `jobs` > 1, the test cases of each task are split in shards run (and judged) by a pool of
+    `jobs` worker processes (see lib.process_pool), and the records are written in order by this process.
+    """
+    from evaluator import Evaluator, judge_options
+    from lib.utils import load_config_files, load_dataset, save_dataset
+    from lib.ollama_utils import reset_ollama_probes
+
+    if batch_export and adaptive:
+        raise ValueError("Adaptive sampling needs the scores during the run: it cannot export batch requests")
+    if queue_path and (batch_export or batch_responses):
+        raise ValueError("Distributed mode cannot be combined with offline batch mode")
+    if jobs > 1 and (queue_path or batch_export or batch_responses):
+        raise ValueError("Process pool mode (jobs > 1) cannot be combined with distributed or offline batch mode")
+
     tasks_cfg_fname = "tasks.yaml"
     cand_model_cfg_fname = "candidate_model.yaml"
     eval_model_cfg_fname = "evaluator.yaml"
@@ -58,63 +444,143 @@ def run_evaluation(config_dir: Path, output_dir: Path, verbose: bool = False):
     try:
         # Setup
         setup_logging(verbose)
+        reset_ollama_probes()
         configs, error_msgs = load_config_files(config_dir)
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
         
         # Create models
         logger.info("Creating models...")
+        if batch_responses:
+            from lib.batch import load_batch_responses
+            responses = load_batch_responses(batch_responses)
+        else:
+            responses = {}
         model_config = configs[cand_model_cfg_fname]
-        model = create_model(
-            model_name=model_config["model"]["name"],
-            model_type=model_config["model"]["type"],
-            **model_config["parameters"]
-        )
+        model = create_batch_model("candidate", model_config, batch_export, responses)
+        warmup_info = {}
+        queue = None
+        if queue_path:
+            # The candidate model is created and warmed up by the workers
+            from lib.work_queue import WorkQueue
+            queue = WorkQueue(queue_path)
+            logger.info(f"Distributed mode: candidate calls are run by the workers of {queue_path}")
+        elif jobs > 1:
+            # The candidate model and the judge are created and warmed up by the worker processes
+            pass
+        elif model is None:
+            model = create_candidate_model(model_config)
+            warmup_info = warmup_model(model, model_config)
+        # Placeholder responses of an export must not be cached
+        cache = ResponseCache(cache_path) if cache_path and not batch_export else None
 
         # evaluatorModel
         evaluator_config = configs[eval_model_cfg_fname]
-        evaluator = create_model(
-            model_name=evaluator_config["model"]["name"],
-            model_type=evaluator_config["model"]["type"],
-            api_key_source=evaluator_config["model"]["api_key_source"],
-            **evaluator_config["parameters"]
-        )
-        
-        evaluator = Evaluator(evaluator, evaluator_config["evaluator_prompt"])
+        evaluator = None
+        if batch_export != "candidate" and jobs <= 1:
+            evaluator = create_batch_model("judge", evaluator_config, batch_export, responses)
+            if evaluator is None:
+                evaluator = create_judge_model(evaluator_config)
+            evaluator = Evaluator(evaluator, evaluator_config["evaluator_prompt"],
+                                  cache=cache, model_key=model_signature(evaluator_config),
+                                  **judge_options(evaluator_config))
+
+        pool = None
+        if jobs > 1:
+            from lib.process_pool import ProcessPool
+            logger.info(f"Starting {jobs} worker processes")
+            pool = ProcessPool(jobs, model_config, evaluator_config, configs[tasks_cfg_fname]["tasks"],
+                               stream=stream, cache_path=cache_path, verbose=verbose)
 
         # Run each task
         for task_name, task_config in configs[tasks_cfg_fname]["tasks"].items():
             try:
                 logger.info(f"Running task: {task_name}")
                 # Create task runner and evaluator
-                ExecutorClass = load_task_executor(module_path=task_config["import_lib"], 
-                                                   class_name=task_config["executor"])
-                task_runner = ExecutorClass(model)
+                if queue is not None:
+                    from lib.work_queue import QueueTaskRunner, task_spec
+                    task_runner = QueueTaskRunner(queue, task_name, task_spec(task_config, model_config, stream))
+                elif pool is not None:
+                    task_runner = pool.task_runner(task_name, task_config)
+                else:
+                    ExecutorClass = load_task_executor(module_path=task_config["import_lib"],
+                                                       class_name=task_config["executor"])
+                    task_runner = create_task_runner(ExecutorClass, model, task_config, stream=stream)
 
                 dataset_fname = task_config["dataset_path"]
                 dataset = load_dataset(dataset_fname)
+                if sample_size is not None or sample_per_stratum is not None:
+                    dataset = sample_dataset(dataset, size=sample_size, per_stratum=sample_per_stratum,
+                                             seed=seed if seed is not None else 0)
+                    logger.info(f"Sampled {len(dataset['test_cases'])} test cases: "
+                                f"{dataset['metadata']['sampling']['label']}")
+
+                history = None
+                previous_fname = output_dir / results_fname(task_name, dataset["metadata"])
+                if schedule == "ljf" and previous_fname.exists():
+                    # Latencies of the previous run of the task, to estimate the cost of the cases
+                    history = latency_history(load_dataset(previous_fname).get("test_cases") or [])
 
-                # Run task
-                results = task_runner.run_task(
-                    dataset_path_or_cases=dataset["test_cases"]
+                if batch_export == "candidate":
+                    # Record the candidate requests, the responses are judged in the second phase
+                    run_scheduled(lambda cases: task_runner.run_task(dataset_path_or_cases=cases),
+                                  dataset["test_cases"], schedule)
+                    continue
+
+                adaptive_options = None
+                if adaptive:
+                    adaptive_options = {
+                        "target_ci_width": target_ci_width,
+                        "batch_size": adaptive_batch_size,
+                        "min_cases": adaptive_min_cases,
+                        "seed": seed
+                    }
+                results, metadata = evaluate_task(
+                    task_name,
+                    task_config,
+                    task_runner,
+                    dataset,
+                    model_config,
+                    evaluator,
+                    evaluator_config,
+                    cache=cache,
+                    adaptive_options=adaptive_options,
+                    schedule=schedule,
+                    dedup_threshold=dedup_threshold,
+                    history=history,
+                    seed=seed
                 )
-                
-                # Run evaluation if required
-                if task_config["run_evaluation"]:
-                    results = evaluator.evaluate_results(
-                        results,
-                        output_path=None
-                    )
-                
-                logger.info(f"Completed task: {task_name}")
+                if warmup_info:
+                    # Measured once before the first task, excluded from the case latencies
+                    metadata["usage"]["warmup"] = warmup_info
+                if queue is not None:
+                    workers = sorted({(r.get("usage") or {}).get("candidate", {}).get("worker") for r in results} - {None})
+                    metadata["distributed"] = {"queue": str(queue_path), "workers": workers}
+                if batch_export:
+                    # Judge requests recorded, the scores are computed in the second phase
+                    continue
+                if responses:
+                    metadata["batch"] = {"replayed_roles": [role for role in ("candidate", "judge")
+                                                            if any(k.startswith(f"{role}-") for k in responses)],
+                                         "response_files": [str(f) for f in batch_responses]}
 
-                output_fname = output_dir / f"{task_name}_results.yaml"
+                output_fname = output_dir / results_fname(task_name, metadata)
                 logger.info(f"Save results in: {output_fname}")
                 save_dataset(path_to_fname=output_fname, 
-                             dataset={"metadata": dataset["metadata"], "test_cases": results})
+                             dataset={"metadata": metadata, "test_cases": results})
                 
             except Exception as e:
                 logger.error(f"Failed to run task {task_name}: {e}")
+
+        if pool is not None:
+            pool.shutdown()
+
+        if batch_export:
+            from lib.batch import write_batch_requests
+            recorder = model if batch_export == "candidate" else evaluator.model
+            batch_fname = output_dir / "batch" / f"{batch_export}_requests.jsonl"
+            n_requests = write_batch_requests(batch_fname, recorder.requests.values())
+            logger.info(f"Wrote {n_requests} {batch_export} requests in: {batch_fname}")
         
         logger.info("Evaluation completed successfully")
         
@@ -123,8 +589,495 @@ def run_evaluation(config_dir: Path, output_dir: Path, verbose: bool = False):
         raise
 
 
+def expand_sweep(sweep_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Expand a sweep spec into the candidate model configurations of its runs.
+
+    The sweep spec holds a list of `models` (name, type, and optional parameters, warmup and pricing)
+    and a `parameter_grid` mapping parameter names to lists of values. Every model is run with every
+    combination of the grid.
+
+    Args:
+        sweep_config: Content of the sweep spec file
+
+    Returns:
+        List of run configurations (same format as candidate_model.yaml) with a `run_id`
+    """
+    grid = sweep_config.get("parameter_grid") or {}
+    names = list(grid)
+    values = [grid[name] if isinstance(grid[name], (list, tuple)) else [grid[name]] for name in names]
+
+    runs = []
+    for model in sweep_config["models"]:
+        for combination in itertools.product(*values):
+            point = dict(zip(names, combination))
+            parameters = {**dict(model.get("parameters") or {}), **point}
+            label = "_".join(f"{k}={v}" for k, v in point.items())
+            run_id = re.sub(r"[^A-Za-z0-9_.=-]+", "-", f"{model['name']}__{label}" if label else model["name"])
+            runs.append({
+                "run_id": run_id,
+                "model": {"name": model["name"], "type": model["type"]},
+                "parameters": parameters,
+                "warmup": model.get("warmup", sweep_config.get("warmup")),
+                "pricing": model.get("pricing")
+            })
+    return runs
+
+
+def format_sweep_table(rows: List[Dict[str, Any]]) -> str:
+    """Format the rows of a sweep summary as a plain-text comparison table."""
+    header = f"{'run':<45} {'task':<25} {'n':>5} {'mean':>7} {'95% CI':>17} {'p50 (s)':>8} {'cost ($)':>9}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        ci = f"[{row['ci_low']}, {row['ci_high']}]" if row["mean"] is not None else "-"
+        lines.append(
+            f"{row['run_id']:<45} {row['task']:<25} {row['n']:>5} {str(row['mean']):>7} {ci:>17} "
+            f"{str(row['latency_p50_s']):>8} {str(row['cost_usd']):>9}"
+        )
+    return "\n".join(lines)
+
+
+def run_sweep(
+    config_dir: Path,
+    output_dir: Path,
+    sweep_path: Path,
+    verbose: bool = False,
+    cache_path: Optional[str] = None,
+    stream: bool = False,
+    schedule: str = "fifo",
+    dedup_threshold: Optional[float] = None,
+    sample_size: Optional[float] = None,
+    sample_per_stratum: Optional[int] = None,
+    seed: Optional[int] = None
+):
+    """
+    Run a model/parameter sweep in a single invocation.
+
+    The runs of the sweep share the datasets (loaded once), the judge client, the response and
+    verdict cache, and a global concurrency budget (`max_concurrency` of the sweep spec): at most
+    that many model calls (candidate and judge) and (run, task) pairs are in flight at the same time. Results of each run are saved in
+    `<output_dir>/<run_id>/`, and a combined comparison table in `<output_dir>/sweep_summary.yaml`.
+
+    Args:
+        config_dir: Configuration directory (evaluator and tasks)
+        output_dir: Output directory for results
+        sweep_path: Sweep spec file
+        verbose: Enable verbose logging
+        cache_path: Path to the response and verdict cache (no caching if None)
+        stream: Stream the candidate responses
+        schedule: Order of the cases sent to the candidate models (see lib.scheduling)
+        dedup_threshold: Run near-duplicate test cases once (see lib.dedup)
+        sample_size: Run the tasks on a stratified subset of this many cases (fraction if below 1)
+        sample_per_stratum: Maximum number of sampled cases per stratum
+        seed: Seed of the sampled subset (0 if None)
+    """
+    from evaluator import Evaluator, judge_options
+    from lib.utils import load_config_files, load_dataset, save_dataset, load_yaml
+    from lib.ollama_utils import reset_ollama_probes
+
+    tasks_cfg_fname = "tasks.yaml"
+    eval_model_cfg_fname = "evaluator.yaml"
+
+    try:
+        # Setup
+        setup_logging(verbose)
+        reset_ollama_probes()
+        configs, error_msgs = load_config_files(config_dir)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        sweep_config = load_yaml(sweep_path)
+        runs = expand_sweep(sweep_config)
+        max_concurrency = int(sweep_config.get("max_concurrency", 1))
+        logger.info(f"Sweep: {len(runs)} runs, max concurrency {max_concurrency}")
+
+        # Shared judge client, cache and budget of model calls (the executors of the tasks
+        # run their cases on their own thread pools)
+        cache = ResponseCache(cache_path) if cache_path else None
+        call_limit = threading.Semaphore(max_concurrency)
+        evaluator_config = configs[eval_model_cfg_fname]
+        evaluator = Evaluator(create_judge_model(evaluator_config), evaluator_config["evaluator_prompt"],
+                              cache=cache, model_key=model_signature(evaluator_config),
+                              call_limit=call_limit, **judge_options(evaluator_config))
+
+        # Load executors and datasets once
+        tasks = {}
+        for task_name, task_config in configs[tasks_cfg_fname]["tasks"].items():
+            try:
+                ExecutorClass = load_task_executor(module_path=task_config["import_lib"],
+                                                   class_name=task_config["executor"])
+                dataset = load_dataset(task_config["dataset_path"])
+                if sample_size is not None or sample_per_stratum is not None:
+                    # The same subset for all the runs of the sweep
+                    dataset = sample_dataset(dataset, size=sample_size, per_stratum=sample_per_stratum,
+                                             seed=seed if seed is not None else 0)
+                tasks[task_name] = (task_config, ExecutorClass, dataset)
+            except Exception as e:
+                logger.error(f"Failed to load task {task_name}: {e}")
+
+        # Create the candidate models, and warm up each distinct model once
+        models = {}
+        warmed_up = set()
+        for run in runs:
+            try:
+                models[run["run_id"]] = create_candidate_model(run)
+                if run["model"]["name"] not in warmed_up:
+                    warmup_model(models[run["run_id"]], run)
+                    warmed_up.add(run["model"]["name"])
+            except Exception as e:
+                logger.error(f"Failed to create model of run {run['run_id']}: {e}")
+
+        def run_unit(run: Dict[str, Any], task_name: str) -> Dict[str, Any]:
+            task_config, ExecutorClass, dataset = tasks[task_name]
+            logger.info(f"Running task {task_name} for run {run['run_id']}")
+            task_runner = create_task_runner(ExecutorClass, models[run["run_id"]], task_config, stream=stream,
+                                             call_limit=call_limit)
+            run_dir = output_dir / run["run_id"]
+            history = None
+            previous_fname = run_dir / results_fname(task_name, dataset["metadata"])
+            if schedule == "ljf" and previous_fname.exists():
+                history = latency_history(load_dataset(previous_fname).get("test_cases") or [])
+            results, metadata = evaluate_task(task_name, task_config, task_runner, dataset, run,
+                                              evaluator, evaluator_config, cache=cache, schedule=schedule,
+                                              dedup_threshold=dedup_threshold, history=history, seed=seed)
+            metadata["sweep_run"] = {"run_id": run["run_id"], "model": run["model"], "parameters": run["parameters"]}
+
+            run_dir.mkdir(parents=True, exist_ok=True)
+            save_dataset(path_to_fname=run_dir / results_fname(task_name, metadata),
+                         dataset={"metadata": metadata, "test_cases": results})
+
+            overall = (metadata.get("summary") or {}).get("overall") or {"n": len(results), "mean": None}
+            candidate_usage = metadata["usage"].get("candidate", {})
+            return {
+                "run_id": run["run_id"],
+                "task": task_name,
+                "n": overall["n"],
+                "mean": overall["mean"],
+                "ci_low": overall.get("ci_low"),
+                "ci_high": overall.get("ci_high"),
+                "latency_p50_s": candidate_usage.get("latency_s", {}).get("p50"),
+                "cost_usd": round(sum(u.get("cost_usd", 0.0) for u in metadata["usage"].values()
+                                      if isinstance(u, dict)), 6)
+            }
+
+        # Global concurrency budget shared by all the runs: (run, task) pairs in flight,
+        # their model calls are capped by call_limit
+        rows = []
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            futures = {
+                pool.submit(run_unit, run, task_name): (run["run_id"], task_name)
+                for run in runs if run["run_id"] in models
+                for task_name in tasks
+            }
+            for future, (run_id, task_name) in futures.items():
+                try:
+                    rows.append(future.result())
+                except Exception as e:
+                    logger.error(f"Failed to run task {task_name} for run {run_id}: {e}")
+
+        rows.sort(key=lambda row: (row["task"], row["run_id"]))
+        print(format_sweep_table(rows))
+
+        summary_metadata = {"sweep_file": str(sweep_path), "n_runs": len(runs)}
+        sampling = {name: dataset["metadata"]["sampling"] for name, (_, _, dataset) in tasks.items()
+                    if "sampling" in dataset["metadata"]}
+        if sampling:
+            summary_metadata["sampling"] = sampling
+        summary_fname = output_dir / "sweep_summary.yaml"
+        save_dataset(path_to_fname=summary_fname,
+                     dataset={"metadata": summary_metadata, "runs": rows})
+        logger.info(f"Sweep completed successfully, summary saved in: {summary_fname}")
+
+    except Exception as e:
+        logger.error(f"Sweep failed: {e}")
+        raise
+
+
+def run_pairwise_evaluation(
+    config_dir: Path,
+    output_dir: Path,
+    challenger_config_path: Path,
+    verbose: bool = False,
+    cache_path: str = DEFAULT_CACHE_PATH,
+    seed: Optional[int] = None
+):
+    """
+    Run the pairwise A/B evaluation pipeline.
+
+    The candidate model of the config directory (A) and the challenger model (B) run
+    concurrently on each task, reusing cached responses of a model that already ran.
+    A single comparative judge prompt decides which response is better, with the
+    position of the responses randomized per case.
+
+    Args:
+        config_dir: Configuration directory (candidate model A, evaluator and tasks)
+        output_dir: Output directory for results
+        challenger_config_path: Configuration file of candidate model B (same format as candidate_model.yaml)
+        verbose: Enable verbose logging
+        cache_path: Path to the response cache
+        seed: Seed for the randomized position of the responses
+    """
+    from evaluator import PairwiseEvaluator, judge_options
+    from lib.utils import load_config_files, load_dataset, save_dataset, load_yaml
+    from lib.aggregation import summarize_pairwise
+    from lib.metrics import apply_pricing, summarize_usage
+    from lib.ollama_utils import reset_ollama_probes
+
+    tasks_cfg_fname = "tasks.yaml"
+    cand_model_cfg_fname = "candidate_model.yaml"
+    eval_model_cfg_fname = "evaluator.yaml"
+
+    try:
+        # Setup
+        setup_logging(verbose)
+        reset_ollama_probes()
+        configs, error_msgs = load_config_files(config_dir)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Create models
+        logger.info("Creating models...")
+        config_a = configs[cand_model_cfg_fname]
+        config_b = load_yaml(challenger_config_path)
+        model_a = create_candidate_model(config_a)
+        model_b = create_candidate_model(config_b)
+        key_a, key_b = model_signature(config_a), model_signature(config_b)
+        cache = ResponseCache(cache_path)
+        warmup_info = {"model_a": warmup_model(model_a, config_a), "model_b": warmup_model(model_b, config_b)}
+
+        evaluator_config = configs[eval_model_cfg_fname]
+        judge = PairwiseEvaluator(create_judge_model(evaluator_config), evaluator_config["pairwise_prompt"], seed=seed,
+                                  **judge_options(evaluator_config))
+
+        # Run each task
+        for task_name, task_config in configs[tasks_cfg_fname]["tasks"].items():
+            try:
+                logger.info(f"Running pairwise task: {task_name}")
+                ExecutorClass = load_task_executor(module_path=task_config["import_lib"],
+                                                   class_name=task_config["executor"])
+                dataset = load_dataset(task_config["dataset_path"])
+                test_cases = dataset["test_cases"]
+
+                # Run both candidate models concurrently
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    runner_a = create_task_runner(ExecutorClass, model_a, task_config)
+                    runner_b = create_task_runner(ExecutorClass, model_b, task_config)
+                    future_a = pool.submit(run_task_cached, runner_a, test_cases, cache, key_a)
+                    future_b = pool.submit(run_task_cached, runner_b, test_cases, cache, key_b)
+                    records_a, records_b = future_a.result(), future_b.result()
+
+                results = judge.evaluate_pairs(records_a, records_b)
+                logger.info(f"Completed pairwise task: {task_name}")
+
+                apply_pricing(results, "candidate_a", config_a.get("pricing"))
+                apply_pricing(results, "candidate_b", config_b.get("pricing"))
+                apply_pricing(results, "judge", evaluator_config.get("pricing"))
+
+                metadata = dataset["metadata"]
+                metadata["pairwise"] = {
+                    "model_a": config_a["model"]["name"],
+                    "model_b": config_b["model"]["name"],
+                    **summarize_pairwise(results, seed=seed)
+                }
+                metadata["usage"] = summarize_usage(results, roles=("candidate_a", "candidate_b", "judge"))
+                metadata["usage"]["warmup"] = warmup_info
+
+                output_fname = output_dir / f"{task_name}_pairwise_results.yaml"
+                logger.info(f"Save results in: {output_fname}")
+                save_dataset(path_to_fname=output_fname,
+                             dataset={"metadata": metadata, "test_cases": results})
+
+            except Exception as e:
+                logger.error(f"Failed to run pairwise task {task_name}: {e}")
+
+        logger.info("Pairwise evaluation completed successfully")
+
+    except Exception as e:
+        logger.error(f"Pairwise evaluation failed: {e}")
+        raise
+
+
+def run_layout_comparison(
+    config_dir: Path,
+    output_dir: Path,
+    verbose: bool = False,
+    cache_path: Optional[str] = None,
+    sample_size: Optional[float] = None,
+    seed: Optional[int] = None
+):
+    """
+    Compare the inline and cached judge prompt layouts on the evaluated tasks.
+
+    The candidate model runs each task once, then the judge scores the same records with both
+    layouts (see evaluator.compare_prompt_layouts). The judge latency, cached tokens, cost and
+    mean score of each layout, and the agreement of their scores, are saved in `prompt_layouts.yaml`.
+
+    Args:
+        config_dir: Configuration directory
+        output_dir: Output directory for the comparison
+        verbose: Enable verbose logging
+        cache_path: Optional path to the response cache of the candidate model
+        sample_size: If set, compare on a stratified subset of SIZE cases (or a fraction if below 1) per task
+        seed: Seed of the subset
+    """
+    from evaluator import compare_prompt_layouts
+    from lib.utils import load_config_files, load_dataset, save_dataset
+    from lib.ollama_utils import reset_ollama_probes
+
+    setup_logging(verbose)
+    reset_ollama_probes()
+    configs, error_msgs = load_config_files(config_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    model_config = configs["candidate_model.yaml"]
+    evaluator_config = configs["evaluator.yaml"]
+    model = create_candidate_model(model_config)
+    judge_model = create_judge_model(evaluator_config)
+    cache = ResponseCache(cache_path) if cache_path else None
+
+    comparison = {}
+    for task_name, task_config in configs["tasks.yaml"]["tasks"].items():
+        if not task_config.get("run_evaluation"):
+            continue
+        try:
+            logger.info(f"Comparing judge prompt layouts on task: {task_name}")
+            dataset = load_dataset(task_config["dataset_path"])
+            if sample_size is not None:
+                dataset = sample_dataset(dataset, size=sample_size, seed=seed or 0)
+            ExecutorClass = load_task_executor(module_path=task_config["import_lib"], class_name=task_config["executor"])
+            task_runner = create_task_runner(ExecutorClass, model, task_config)
+            records = run_task_cached(task_runner, dataset["test_cases"], cache, model_signature(model_config))
+            comparison[task_name] = compare_prompt_layouts(judge_model, evaluator_config["evaluator_prompt"], records,
+                                                           pricing=evaluator_config.get("pricing"))
+
+            for layout in ("inline", "cached"):
+                summary = comparison[task_name][layout]
+                logger.info(f"{task_name} [{layout}]: mean score {summary['mean_score']}, "
+                            f"judge latency p50 {summary.get('latency_s', {}).get('p50')}s, "
+                            f"prompt tokens {summary.get('prompt_tokens')} ({summary.get('cached_tokens')} cached), "
+                            f"cost {summary.get('cost_usd')} USD")
+            scores = comparison[task_name]["scores"]
+            logger.info(f"{task_name}: both layouts give the same score on {scores['agreement']} of the "
+                        f"{scores['n_records']} records (mean absolute difference {scores['mean_abs_diff']})")
+        except Exception as e:
+            logger.error(f"Failed to compare prompt layouts on task {task_name}: {e}")
+
+    output_fname = output_dir / "prompt_layouts.yaml"
+    save_dataset(path_to_fname=output_fname, dataset={"judge_model": evaluator_config["model"]["name"],
+                                                      "tasks": comparison})
+    logger.info(f"Prompt layout comparison saved in: {output_fname}")
+
+
+def run_worker(
+    queue_path: str,
+    worker_id: Optional[str] = None,
+    batch_size: int = 4,
+    lease_s: float = DEFAULT_LEASE_S,
+    poll_interval: float = 1.0,
+    idle_timeout: Optional[float] = None,
+    verbose: bool = False
+):
+    """
+    Run the worker loop of the distributed mode.
+
+    The worker leases batches of up to `batch_size` cases from the work queue, runs them with the
+    task executor and candidate model of their spec (created and warmed up once per spec), and posts
+    the results. Its leases are renewed while the cases run; if the worker dies, its cases are
+    re-delivered to other workers once the leases expire.
+
+    Args:
+        queue_path: SQLite file of the work queue, shared with the coordinator
+        worker_id: Identifier of the worker (default: host name and a random suffix)
+        batch_size: Maximum number of cases leased at once
+        lease_s: Duration of a lease in seconds
+        poll_interval: Delay between two polls of an empty queue, in seconds
+        idle_timeout: Exit after this many seconds without work (run forever if None)
+        verbose: Enable verbose logging
+    """
+    import json
+    from lib.work_queue import WorkQueue, default_worker_id
+
+    setup_logging(verbose)
+    worker_id = worker_id or default_worker_id()
+    queue = WorkQueue(queue_path)
+    runners: Dict[str, Any] = {}
+    logger.info(f"Worker {worker_id} polling {queue_path}")
+
+    idle_since = time.monotonic()
+    while True:
+        leased = queue.lease(worker_id, limit=batch_size, lease_s=lease_s)
+        if leased is None:
+            if idle_timeout is not None and time.monotonic() - idle_since > idle_timeout:
+                logger.info(f"Worker {worker_id}: no work for {idle_timeout}s, exiting")
+                return
+            time.sleep(poll_interval)
+            continue
+
+        spec = leased["spec"]
+        positions = [item["position"] for item in leased["items"]]
+        spec_key = json.dumps(spec, sort_keys=True)
+        if spec_key not in runners:
+            task_config, model_config = spec["task_config"], spec["model_config"]
+            model = create_candidate_model(model_config)
+            warmup_model(model, model_config)
+            ExecutorClass = load_task_executor(module_path=task_config["import_lib"],
+                                               class_name=task_config["executor"])
+            runners[spec_key] = create_task_runner(ExecutorClass, model, task_config, stream=spec.get("stream", False))
+
+        # Renew the leases while the cases run
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(lease_s / 3):
+                queue.renew(worker_id, leased["batch_id"], positions, lease_s=lease_s)
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            results = runners[spec_key].run_task(dataset_path_or_cases=[item["case"] for item in leased["items"]])
+        finally:
+            done.set()
+            heartbeat_thread.join()
+
+        for position, result in zip(positions, results):
+            if "candidate" in (result.get("usage") or {}):
+                result["usage"]["candidate"]["worker"] = worker_id
+            if not queue.complete(worker_id, leased["batch_id"], position, result):
+                logger.warning(f"Case {position} of batch {leased['batch_id']} was re-delivered, result dropped")
+        logger.info(f"Worker {worker_id}: {len(results)} cases of task {leased['task']} done")
+        idle_since = time.monotonic()
+
+
+def worker_main(argv: List[str]):
+    """Command line of `main.py worker`."""
+    parser = argparse.ArgumentParser(prog="main.py worker",
+                                     description="Worker of the distributed mode: run the cases of a work queue")
+    parser.add_argument("--queue", type=str, default=DEFAULT_QUEUE_PATH,
+                        help=f"SQLite file of the work queue, shared with the coordinator (default: {DEFAULT_QUEUE_PATH})")
+    parser.add_argument("--worker-id", type=str, default=None, help="Identifier of the worker (default: host name)")
+    parser.add_argument("--batch-size", type=int, default=4, help="Maximum number of cases leased at once")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_S,
+                        help="Lease duration in seconds: cases of a worker silent for longer are re-delivered")
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="Exit after this many seconds without work (default: run until interrupted)")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    args = parser.parse_args(argv)
+
+    try:
+        run_worker(args.queue, worker_id=args.worker_id, batch_size=args.batch_size, lease_s=args.lease,
+                   idle_timeout=args.idle_timeout, verbose=args.verbose)
+    except KeyboardInterrupt:
+        # Leased cases are re-delivered once their leases expire
+        logger.info("Worker interrupted")
+
+
 def main():
-    parser = argparse.ArgumentParser(description="LLM Evaluation Tool")
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        worker_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="LLM Evaluation Tool",
+                                     epilog="Run `main.py worker --help` for the worker of the distributed mode (--queue).")
     
     parser.add_argument(
         "--config",
@@ -146,9 +1099,188 @@ def main():
         help="Enable verbose logging"
     )
     
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Run cases in stratified random batches and stop once the score confidence interval converges"
+    )
+
+    parser.add_argument(
+        "--target-ci-width",
+        type=float,
+        default=0.5,
+        help="Adaptive mode: stop a task once the confidence interval of its mean score is narrower than this"
+    )
+
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=10,
+        help="Adaptive mode: number of cases generated and judged per batch"
+    )
+
+    parser.add_argument(
+        "--min-cases",
+        type=int,
+        default=20,
+        help="Adaptive mode: minimum number of cases run before stopping"
+    )
+
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed for random sampling of test cases"
+    )
+    
+    parser.add_argument(
+        "--cache",
+        type=str,
+        nargs="?",
+        const=DEFAULT_CACHE_PATH,
+        default=None,
+        help=f"Cache candidate model responses in this SQLite file (default when flag is given: {DEFAULT_CACHE_PATH})"
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream candidate responses to record time-to-first-token, inter-token latency and tokens/sec"
+    )
+
+    parser.add_argument(
+        "--schedule",
+        type=str,
+        choices=list(SCHEDULES),
+        default="fifo",
+        help="Order of the cases sent to the candidate model: dataset order (fifo), grouped by shared prompt prefix (prefix), "
+             "or longest estimated cases first (ljf, estimated from prompt and expected response lengths and the latencies "
+             "of the previous results in the output directory)"
+    )
+
+    parser.add_argument(
+        "--sample",
+        type=float,
+        default=None,
+        metavar="SIZE",
+        help="Smoke run on a reproducible stratified subset (difficulty_level, sub_category) of SIZE cases per task, or a fraction if below 1 (seeded with --seed)"
+    )
+
+    parser.add_argument(
+        "--sample-per-stratum",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Sampled runs: at most N cases per stratum"
+    )
+
+    parser.add_argument(
+        "--dedup",
+        type=float,
+        nargs="?",
+        const=0.8,
+        default=None,
+        metavar="THRESHOLD",
+        help="Run near-duplicate test cases once and copy their results to the duplicates (default threshold when flag is given: 0.8)"
+    )
+
+    parser.add_argument(
+        "--batch-export",
+        type=str,
+        choices=["candidate", "judge"],
+        default=None,
+        help="Offline batch mode, phase 1: write the candidate or judge requests to <output>/batch/ in the OpenAI batch format"
+    )
+
+    parser.add_argument(
+        "--batch-responses",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Offline batch mode, phase 2: answer the candidate and/or judge calls from these batch output files"
+    )
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Run the cases of each task in shards on this many worker processes (process pool mode)"
+    )
+
+    parser.add_argument(
+        "--queue",
+        type=str,
+        nargs="?",
+        const=DEFAULT_QUEUE_PATH,
+        default=None,
+        help=f"Distributed mode: push the candidate calls to this SQLite work queue, run by `main.py worker` processes (default when flag is given: {DEFAULT_QUEUE_PATH})"
+    )
+
+    parser.add_argument(
+        "--pairwise",
+        type=Path,
+        default=None,
+        help="Configuration file of a challenger model B: compare it pairwise against the candidate model A"
+    )
+    
+    parser.add_argument(
+        "--sweep",
+        type=Path,
+        default=None,
+        help="Sweep spec file (list of models and parameter grid): run all combinations in one invocation"
+    )
+    
+    parser.add_argument(
+        "--compare-prompt-layouts",
+        action="store_true",
+        help="Judge the same candidate responses with the inline and cached judge prompt layouts, and save their "
+             "latency, cost and score agreement in <output>/prompt_layouts.yaml (accepts --sample, --seed and --cache)"
+    )
+
     args = parser.parse_args()
+
+    if args.compare_prompt_layouts:
+        run_layout_comparison(args.config, args.output, args.verbose, cache_path=args.cache,
+                              sample_size=args.sample, seed=args.seed)
+        return
+
+    if args.sweep:
+        run_sweep(args.config, args.output, args.sweep, args.verbose, cache_path=args.cache, stream=args.stream,
+                  schedule=args.schedule, dedup_threshold=args.dedup, sample_size=args.sample,
+                  sample_per_stratum=args.sample_per_stratum, seed=args.seed)
+        return
+
+    if args.pairwise:
+        run_pairwise_evaluation(
+            args.config,
+            args.output,
+            args.pairwise,
+            args.verbose,
+            cache_path=args.cache or DEFAULT_CACHE_PATH,
+            seed=args.seed
+        )
+        return
     
-    run_evaluation(args.config, args.output, args.verbose)
+    run_evaluation(
+        args.config,
+        args.output,
+        args.verbose,
+        adaptive=args.adaptive,
+        target_ci_width=args.target_ci_width,
+        adaptive_batch_size=args.batch_size,
+        adaptive_min_cases=args.min_cases,
+        seed=args.seed,
+        cache_path=args.cache,
+        stream=args.stream,
+        batch_export=args.batch_export,
+        batch_responses=args.batch_responses,
+        schedule=args.schedule,
+        dedup_threshold=args.dedup,
+        sample_size=args.sample,
+        sample_per_stratum=args.sample_per_stratum,
+        queue_path=args.queue,
+        jobs=args.jobs
+    )
 
 
 if __name__ == "__main__":
@@ -1,23 +1,29 @@
 import os
+import json
 import logging
-from typing import Optional, Any
-import requests
+import threading
+from typing import Optional, Any, Dict, Tuple
 from pathlib import Path
 
 
 logger = logging.getLogger(__name__)
 
 
-def check_ollama_available(model_name: str) -> bool:
-    """Check if Ollama model is available locally."""
-    try:
-        response = requests.get("http://localhost:11434/api/tags")
-        if response.status_code == 200:
-            models = response.json().get("models", [])
-            return any(m["name"] == model_name for m in models)
-        return False
-    except Exception:
-        return False
+# Process-wide registry of model clients, shared by the CLI and all the Streamlit pages/reruns
+_MODEL_REGISTRY: Dict[Tuple[str, str, Optional[str], str], Any] = {}
+_MODEL_REGISTRY_LOCK = threading.Lock()
+
+
+def check_ollama_available(model_name: str, base_url: Optional[str] = None) -> bool:
+    """
+    Check if Ollama model is available locally.
+
+    Uses a shared probe with connect/read timeouts, a TTL cache of the model list and a circuit
+    breaker that fails fast once the server was marked unhealthy (see lib.ollama_utils).
+    """
+    from lib.ollama_utils import get_ollama_probe
+
+    return get_ollama_probe(base_url).is_model_available(model_name)
 
 def get_openai_apikey(api_key_source: str) -> str:
     """
@@ -67,7 +73,7 @@ def create_model(
     
     Args:
         model_name: Name of the model to create
-        model_type: Type of model ("openai" or "ollama")
+        model_type: Type of model ("openai", "ollama" or "mock")
         api_key_source: Source of API key for OpenAI models ("env" or "file")
         **kwargs: Additional model parameters
     
@@ -92,9 +98,12 @@ def create_model(
             
         elif model_type == "ollama":
             from langchain_ollama import OllamaLLM
-            
+            from lib.ollama_utils import get_ollama_probe
+
+            # Fail fast once the server was marked unhealthy during the run
+            get_ollama_probe(kwargs.get("base_url")).check()
             # Check if model is available
-            if not check_ollama_available(model_name):
+            if not check_ollama_available(model_name, kwargs.get("base_url")):
                 logger.warning(f"Model {model_name} not found. Please pull it using 'ollama pull {model_name}'")
                 raise ValueError(f"Ollama model {model_name} not available")
             
@@ -103,6 +112,15 @@ def create_model(
                 **kwargs
             )
             
+        elif model_type == "mock":
+            from lib.mock_model import MockLLM
+
+            # Deterministic offline model, for benchmarks and tests of the pipeline
+            return MockLLM(
+                model=model_name,
+                **kwargs
+            )
+            
         else:
             raise ValueError(f"Unsupported model type: {model_type}")
             
@@ -110,6 +128,46 @@ def create_model(
         logger.error(f"Failed to create model: {e}")
         raise
 
+def get_model(
+    model_name: str,
+    model_type: str = "openai",
+    api_key_source: Optional[str] = None,
+    **kwargs
+) -> Any:
+    """
+    Return a shared language model instance, created on first use.
+
+    Instances are kept in a process-wide registry keyed by (type, name, api key source, parameters),
+    so that SDK imports, API key lookup, availability checks and HTTP connection pools are reused
+    across runs and Streamlit reruns. Use `clear_model_registry` when the model configuration changes.
+
+    Args:
+        model_name: Name of the model to create
+        model_type: Type of model ("openai", "ollama" or "mock")
+        api_key_source: Source of API key for OpenAI models ("env" or "file")
+        **kwargs: Additional model parameters
+
+    Returns:
+        Language model instance
+    """
+    key = (model_type, model_name, api_key_source, json.dumps(kwargs, sort_keys=True, default=str))
+    with _MODEL_REGISTRY_LOCK:
+        model = _MODEL_REGISTRY.get(key)
+        if model is None:
+            model = create_model(model_name, model_type=model_type, api_key_source=api_key_source, **kwargs)
+            _MODEL_REGISTRY[key] = model
+        else:
+            logger.debug(f"Reusing {model_type} model client: {model_name}")
+    return model
+
+
+def clear_model_registry() -> None:
+    """Drop all the registered model clients (e.g. after the model configuration was edited)."""
+    with _MODEL_REGISTRY_LOCK:
+        _MODEL_REGISTRY.clear()
+    logger.info("Model client registry cleared")
+
+
 if __name__ == "__main__":
     # Example usage
     logging.basicConfig(level=logging.INFO)
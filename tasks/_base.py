@@ -0,0 +1,214 @@
+import time
+import logging
+import threading
+from contextlib import nullcontext
+from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from lib.utils import load_dataset
+from lib.hedging import DEFAULT_MAX_EXTRA_LOAD, HedgePolicy
+
+
+logger = logging.getLogger(__name__)
+
+
+# HTTP status codes of transient backend errors (rate limit, overload, timeouts)
+RETRY_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Check if a model call failed with a transient error worth retrying."""
+    if getattr(error, "status_code", None) in RETRY_STATUS_CODES:
+        return True
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # Timeout and connection errors of the HTTP clients of the model SDKs (requests, httpx)
+    return any(word in type(error).__name__ for word in ("Timeout", "Connection"))
+
+
+class TaskEngine:
+    """
+    Generic engine of the task executors.
+
+    Loads and validates the test cases, then sends one prompt per case to the candidate model
+    and collects the responses with their usage metrics. The engine handles concurrency
+    (`max_workers` cases in flight), retries of transient errors with exponential backoff,
+    hedging of straggler calls, streaming, and an optional response cache.
+
+    Task executors subclass the engine and only define the task: its `task_label`, the
+    `required_fields` of its cases, the `prompt_messages` template and `prompt_inputs`,
+    and optionally a `postprocess` step of the responses.
+    """
+
+    task_label = "task"
+    required_fields = ["instruction", "system_prompt"]
+    # (role, template) messages of the prompt, filled with `prompt_inputs`
+    prompt_messages: List[Tuple[str, str]] = [
+        ("system", "{system_prompt}"),
+        ("user", "{instruction}")
+    ]
+
+    def __init__(
+        self,
+        model: Any,
+        stream: bool = False,
+        max_workers: int = 1,
+        max_retries: int = 2,
+        retry_backoff: float = 1.0,
+        cache: Optional[Any] = None,
+        model_key: str = "",
+        hedge_percentile: Optional[float] = None,
+        hedge_max_extra_load: float = DEFAULT_MAX_EXTRA_LOAD,
+        call_limit: Optional[threading.Semaphore] = None
+    ):
+        """
+        Initialize with a language model.
+
+        Args:
+            model: Candidate language model
+            stream: If True, stream the responses to measure time-to-first-token and tokens/sec
+            max_workers: Number of cases sent to the model concurrently
+            max_retries: Number of retries of a case after a transient error
+            retry_backoff: Delay before the first retry in seconds, doubled at each retry
+            cache: Optional ResponseCache, to reuse the responses of the model across runs
+            model_key: Signature of the candidate model, used as cache key
+            hedge_percentile: If set, a call still running after this percentile of the observed
+                latencies is duplicated and the first response is used (see lib.hedging)
+            hedge_max_extra_load: Maximum ratio of duplicate calls to calls
+            call_limit: Optional semaphore shared with other executors and judges, held during each
+                model call, to cap the model calls in flight across them (e.g. the budget of a sweep)
+        """
+        self.model = model
+        self.stream = stream
+        self.max_workers = max(1, int(max_workers))
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff = retry_backoff
+        self.cache = cache
+        self.model_key = model_key
+        self.call_limit = call_limit
+        self.hedge = None
+        if hedge_percentile is not None:
+            self.hedge = HedgePolicy(hedge_percentile, hedge_max_extra_load, max_workers=self.max_workers)
+
+    def load_cases(self, dataset_path_or_cases: str | List[dict]) -> List[Dict[str, Any]]:
+        """Return the test cases of a dataset file, or the given list of test cases."""
+        # Check if dataset_path_or_cases is a string (file path) or a list of test cases
+        if isinstance(dataset_path_or_cases, str):
+            try:
+                return load_dataset(dataset_path_or_cases)["test_cases"]
+            except Exception as e:
+                logger.error(f"Failed to load dataset: {e}")
+                raise
+        elif isinstance(dataset_path_or_cases, list):
+            return dataset_path_or_cases
+        else:
+            raise ValueError("dataset_path_or_cases must be a string or a list of dictionaries")
+
+    def validate(self, test_cases: List[Dict[str, Any]]) -> None:
+        """Check that every test case holds the required fields."""
+        for test_case in test_cases:
+            missing = [f for f in self.required_fields if f not in test_case]
+            if missing:
+                raise ValueError(f"Missing required fields in cases: {missing}")
+
+    def build_chain(self) -> Any:
+        """Build the chain prompt | model of the task."""
+        # LangChain is only imported when the task is run
+        from langchain_core.prompts import ChatPromptTemplate
+
+        return ChatPromptTemplate.from_messages(self.prompt_messages) | self.model
+
+    def prompt_inputs(self, test_case: Dict[str, Any]) -> Dict[str, Any]:
+        """Values of the prompt variables for a test case."""
+        return {
+            "system_prompt": test_case["system_prompt"],
+            "instruction": test_case["instruction"]
+        }
+
+    def postprocess(self, test_case: Dict[str, Any], response: str) -> str:
+        """Task-specific processing of the model response (none by default)."""
+        return response
+
+    def run_case(self, chain: Any, test_case: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a single test case, retrying transient errors.
+
+        Returns:
+            The test case with the model response, and the usage of the model call
+        """
+        from lib.cache import response_key
+        from lib.metrics import invoke_with_usage
+
+        cache_key = response_key(self, self.model_key, test_case) if self.cache is not None else None
+        if cache_key and (cached := self.cache.get("responses", cache_key)) is not None:
+            return {**test_case, "model_response": cached, "score": None, "feedback": None,
+                    "usage": {"candidate": {"cached": True}}}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Get model response
+                if self.hedge is not None:
+                    response, usage = self.hedge.invoke(chain, self.prompt_inputs(test_case), stream=self.stream,
+                                                        call_limit=self.call_limit)
+                else:
+                    with self.call_limit or nullcontext():
+                        response, usage = invoke_with_usage(chain, self.prompt_inputs(test_case), stream=self.stream)
+                break
+            except Exception as e:
+                if attempt < self.max_retries and is_transient_error(e):
+                    delay = self.retry_backoff * 2 ** attempt
+                    logger.warning(f"Retrying case {test_case.get('case_id', '?')} in {delay:.1f}s: {e}")
+                    time.sleep(delay)
+                    continue
+                logger.error(f"Error processing case {test_case.get('case_id', '?')}: {e}")
+                return {
+                    **test_case,
+                    "model_response": f"ERROR: {str(e)}",
+                    "score": None,
+                    "feedback": None
+                }
+
+        if attempt:
+            usage["retries"] = attempt
+        response = self.postprocess(test_case, response.content if hasattr(response, 'content') else response)
+        if cache_key:
+            self.cache.set("responses", cache_key, response)
+
+        return {
+            **test_case,  # Keep original fields
+            "model_response": response,
+            "score": None,  # Will be filled by evaluator
+            "feedback": None,  # Will be filled by evaluator
+            "usage": {"candidate": usage}  # Token counts and latency of the model call
+        }
+
+    def run_task(self, dataset_path_or_cases: str | List[dict]) -> List[Dict[str, Any]]:
+        """
+        Run the task with the candidate model.
+
+        Args:
+            dataset_path_or_cases: Path to dataset YAML file or a list of test cases
+
+        Returns:
+            List of results with model responses, in the order of the test cases
+        """
+        test_cases = self.load_cases(dataset_path_or_cases)
+        self.validate(test_cases)
+        chain = self.build_chain()
+        desc = f"Running {self.task_label} task"
+        if self.hedge is not None:
+            self.hedge.open()
+
+        try:
+            if self.max_workers == 1:
+                return [self.run_case(chain, test_case) for test_case in tqdm(test_cases, desc=desc)]
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                # map keeps the order of the test cases
+                return list(tqdm(pool.map(lambda case: self.run_case(chain, case), test_cases),
+                                 total=len(test_cases), desc=desc))
+        finally:
+            if self.hedge is not None:
+                # Do not keep threads running the losers of hedged calls after the task
+                self.hedge.close()
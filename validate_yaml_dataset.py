@@ -1,88 +1,160 @@
+import os
+import sys
 import yaml
 from pathlib import Path
 import argparse
-from typing import Dict, Any, List
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+# LibYAML bindings parse several times faster than the pure-Python loader
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+DIFFICULTY_LEVELS = frozenset(["easy", "medium", "hard"])
+REQUIRED_CASE_KEYS = ("case_id", "category", "system_prompt", "expected_response", "difficulty_level")
+STRING_CASE_FIELDS = ("system_prompt", "expected_response")
+# Below this number of files, validating in the current process is faster than starting workers
+MIN_FILES_PER_PROCESS = 8
+
+
+# Rules of a test case: (check, error message), built once. A check receives the case and
+# the metadata category and returns True if the case is valid; messages are formatted with the case.
+CaseRule = Tuple[Callable[[Dict[str, Any], Any], bool], Callable[[Dict[str, Any]], str]]
+CASE_RULES: List[CaseRule] = [
+    (lambda case, category: isinstance(case["case_id"], int),
+     lambda case: f"'case_id' must be an integer, got {type(case['case_id']).__name__}"),
+    (lambda case, category: case["category"] == category,
+     lambda case: f"'category' value must match the metadata 'category' value, got {case['category']}"),
+    *[
+        (lambda case, category, field=field: isinstance(case[field], str),
+         lambda case, field=field: f"'{field}' must be a string, got {type(case[field]).__name__}")
+        for field in STRING_CASE_FIELDS
+    ],
+    (lambda case, category: "challenges" not in case or isinstance(case["challenges"], str),
+     lambda case: f"'challenges' must be a string or empty string, got {case['challenges']}"),
+    (lambda case, category: case["difficulty_level"] in DIFFICULTY_LEVELS,
+     lambda case: f"'difficulty_level' must be 'easy', 'medium', or 'hard', got {case['difficulty_level']}"),
+]
+
+
+def validate_metadata(metadata: Any) -> List[str]:
+    """Return the violations of the metadata section of a dataset."""
+    if not isinstance(metadata, dict):
+        return ["'metadata' must be a mapping"]
+    if "description" not in metadata or "category" not in metadata:
+        return ["'description' and 'category' keys are required in the metadata."]
+
+    errors = []
+    category = metadata["category"]
+    if not isinstance(category, str) or not category.islower():
+        errors.append(f"'category' value must be a lowercase string, got {category}")
+    elif "task" in category:
+        errors.append(f"'category' value must not contain the substring 'task', got {category}")
+    return errors
+
+
+def validate_test_case(case: Any, category: Any) -> List[str]:
+    """Return the violations of a test case, prefixed with its case_id."""
+    if not isinstance(case, dict):
+        return [f"test case must be a mapping, got {type(case).__name__}"]
+
+    label = f"case_id {case.get('case_id', '?')}"
+    missing = [key for key in REQUIRED_CASE_KEYS if key not in case]
+    if missing:
+        return [f"{label}: missing required keys {missing}"]
+    return [f"{label}: {message(case)}" for check, message in CASE_RULES if not check(case, category)]
+
+
+def validate_dataset(data: Any) -> List[str]:
+    """
+    Validate the content of a dataset file.
+
+    Args:
+        data: Parsed content of the file
+
+    Returns:
+        List of all the violations (empty if the dataset is valid)
+    """
+    if not isinstance(data, dict) or "metadata" not in data or "test_cases" not in data:
+        return ["'metadata' and 'test_cases' keys are required."]
+
+    errors = validate_metadata(data["metadata"])
+    category = data["metadata"].get("category") if isinstance(data["metadata"], dict) else None
+
+    test_cases = data["test_cases"]
+    if not test_cases:
+        errors.append("'test_cases' list must not be empty.")
+        return errors
+
+    for case in test_cases:
+        errors.extend(validate_test_case(case, category))
 
+    counts = Counter(case.get("case_id") for case in test_cases if isinstance(case, dict) and "case_id" in case)
+    errors.extend(f"duplicate case_id {case_id} ({n} cases)" for case_id, n in counts.items() if n > 1)
+    return errors
 
-def validate_yaml_file(file_path: str) -> None:
+
+def validate_yaml_file(file_path: str) -> List[str]:
+    """Load a dataset file and return all its violations."""
     try:
         with open(file_path, 'r') as file:
-            data = yaml.safe_load(file)
+            data = yaml.load(file, Loader=SafeLoader)
     except Exception as e:
-        print(f"Error opening file: {e}")
-        return
+        return [f"Error opening file: {e}"]
+    return validate_dataset(data)
 
-    # Check that the required keys exist
-    if 'metadata' not in data or 'test_cases' not in data:
-        print("Error: 'metadata' and 'test_cases' keys are required.")
-        return
 
-    # Validate metadata
-    metadata = data['metadata']
-    if 'description' not in metadata or 'category' not in metadata:
-        print("Error: 'description' and 'category' keys are required in the metadata.")
-        return
+def find_dataset_files(paths: List[str]) -> List[str]:
+    """Expand files and directories (searched recursively) into the list of YAML dataset files."""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(str(f) for f in path.rglob("*") if f.suffix in (".yaml", ".yml")))
+        else:
+            files.append(str(path))
+    return files
 
-    if 'task' in metadata['category'].lower():
-        val = metadata['category']
-        print("Error: 'category' value must not contain the substring 'task', got {val}")
-        return
 
-    if not isinstance(metadata['category'], str) or not metadata['category'].islower():
-        val = metadata['category']
-        print(f"Error: 'category' value must be a lowercase string, got {val}")
+def validate_files(files: List[str], jobs: Optional[int] = None) -> Dict[str, List[str]]:
+    """
+    Validate dataset files, in parallel worker processes for large sets.
 
-        return
+    Args:
+        files: Paths of the dataset files
+        jobs: Number of worker processes (default: number of CPUs)
 
-    # Validate test cases
-    test_cases = data['test_cases']
-    if not test_cases:
-        print("Error: 'test_cases' list must not be empty.")
-        return
+    Returns:
+        Dict mapping each file to its violations
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(files) < MIN_FILES_PER_PROCESS:
+        return {f: validate_yaml_file(f) for f in files}
 
-    for case in test_cases:
-        # Check required keys
-        required_keys = ['case_id', 'category', 'system_prompt', 'expected_response', 'difficulty_level']
-        for key in required_keys:
-            if key not in case:
-                print(f"Error: '{key}' is a required key in the test case.")
-                return
-
-        # Validate case_id
-        if not isinstance(case['case_id'], int):
-            print(f"Error: 'case_id' must be an integer, got {type(case['case_id'])}.")
-            return
-
-        # Validate category
-        if case['category'] != metadata['category']:
-            val = metadata['category']
-            print(f"Error: 'category' value must match the metadata 'category' value, got {val}")
-            return
-
-        # Validate system_prompt and expected_response
-        for field in ['system_prompt', 'expected_response']:
-            if not isinstance(case[field], str):
-                print(f"Error: '{field}' must be a string, got {type(case[field])}.")
-                return
-
-        # Validate challenges
-        if 'challenges' in case and not isinstance(case['challenges'], str):
-            val = case['challenges']
-            print("Error: 'challenges' must be a string or empty string, got {val}")
-            return
-
-        # Validate difficulty_level
-        if case['difficulty_level'] not in ['easy', 'medium', 'hard']:
-            val = case['difficulty_level']
-            print("Error: 'difficulty_level' must be 'easy', 'medium', or 'hard', got {val}")
-            return
-
-    print(f"\nYML dataset file is valid: {file_path}: ")
+    chunksize = max(1, len(files) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return dict(zip(files, pool.map(validate_yaml_file, files, chunksize=chunksize)))
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Validate a YAML file')
-    parser.add_argument('--file_path', type=str, help='Path to the YAML file')
+    parser = argparse.ArgumentParser(description='Validate YAML dataset files')
+    parser.add_argument('paths', nargs='*', default=None, help='Dataset files or directories (default: datasets/)')
+    parser.add_argument('--file_path', type=str, default=None, help='Path to a single YAML file')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of worker processes (default: number of CPUs)')
     args = parser.parse_args()
 
-    validate_yaml_file(args.file_path)
\ No newline at end of file
+    paths = args.paths or ([args.file_path] if args.file_path else ["datasets"])
+    results = validate_files(find_dataset_files(paths), jobs=args.jobs)
+
+    n_invalid = 0
+    for file_path, errors in results.items():
+        if errors:
+            n_invalid += 1
+            print(f"\n{file_path}: {len(errors)} error(s)")
+            for error in errors:
+                print(f"  - Error: {error}")
+    print(f"\nValidated {len(results)} YML dataset files: {len(results) - n_invalid} valid, {n_invalid} invalid")
+    sys.exit(1 if n_invalid else 0)